@@ -0,0 +1,87 @@
+###################################################################################
+# benchmark of the DateLinker modes                                              #
+# the abstracts are linked with SUTime only ("sutime"), with the utils.dates     #
+# rules and SUTime for the sentences they are unsure about ("fast") and with the #
+# rules only ("rules"), SUTime modes also with batches of documents per call.    #
+# The dates of each mode are compared with the SUTime ones overall and per rule  #
+# run from the root of the repository:                                           #
+#   python benchmarks/dates.py -d ./datasets/wikipedia-abstracts/csv/dbpedia-abstracts.csv -n 1000
+###################################################################################
+
+import argparse
+import itertools
+import os
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pipeline.datareader import DBpediaAbstractsDataReader
+from pipeline.entitylinker import DateLinker
+from utils.dates import recognize_dates, date_uri, DATE_VALUE
+
+parser = argparse.ArgumentParser(description='SUTime vs rule based date linking')
+parser.add_argument('-d', '--dataset', help='DBpedia abstracts csv file', required=True)
+parser.add_argument('-m', '--mapping', help='DBpedia to Wikidata uri mapping file of the dataset')
+parser.add_argument('-n', '--documents', type=int, default=1000, help='number of documents')
+parser.add_argument('-b', '--batch', type=int, default=200, help='documents per SUTime call of the batched modes')
+parser.add_argument('-e', '--errors', type=int, default=20, help='number of disagreements printed for each mode')
+args = parser.parse_args()
+
+reader = DBpediaAbstractsDataReader(args.dataset, db_wd_mapping=args.mapping)
+documents = list(itertools.islice(reader.read_documents(), args.documents))
+
+# the batched modes link args.batch documents per SUTime call with DateLinker.run_batch
+modes = ["sutime", "sutime-batch", "fast", "fast-batch", "rules"]
+linkers = dict((mode, DateLinker(mode=mode.replace("-batch", ""))) for mode in modes)
+times = dict((mode, 0.0) for mode in modes)
+found = dict((mode, []) for mode in modes)
+
+for mode in modes:
+    for d in documents:
+        d.entities = []
+    start = time.time()
+    if mode.endswith("-batch"):
+        linkers[mode].run_batch(documents, args.batch)
+    else:
+        for d in documents:
+            linkers[mode].run(d)
+    times[mode] += time.time() - start
+    found[mode] = [set([(e.boundaries, e.uri) for e in d.entities]) for d in documents]
+
+# dates of the rules of each pattern against the SUTime dates, in the sentences the rules are sure about
+patterns = defaultdict(lambda: [0, 0])
+for d, reference in zip(documents, found["sutime"]):
+    for (start, end) in d.sentences_boundaries:
+        for date in recognize_dates(d.text, start, end) or []:
+            if DATE_VALUE.match(date["value"]):
+                patterns[date["pattern"]][0] += 1
+                if ((date["start"], date["end"]), date_uri(date["value"])) in reference:
+                    patterns[date["pattern"]][1] += 1
+
+docs = len(documents)
+print("%s documents, %s dates found by SUTime" % (docs, sum([len(r) for r in found["sutime"]])))
+for mode in modes:
+    counts = linkers[mode].counts
+    common = sum([len(a & r) for a, r in zip(found[mode], found["sutime"])])
+    total = sum([len(a) for a in found[mode]])
+    reference = sum([len(r) for r in found["sutime"]])
+    print("%-13s %.2fs  %.1f docs/s  %.1fx  precision %.4f  recall %.4f  sentences rules/sutime %s/%s  "
+          "sutime documents %s  calls %s" % (
+              mode + ":", times[mode], docs / max(times[mode], 1e-9), times["sutime"] / max(times[mode], 1e-9),
+              common / float(max(total, 1)), common / float(max(reference, 1)),
+              counts["rules"], counts["sutime"], counts["sutime_documents"], counts["sutime_calls"]))
+
+print("agreement of each rule with SUTime")
+for name in sorted(patterns):
+    total, agree = patterns[name]
+    print("  %-18s %6s dates  %.4f" % (name, total, agree / float(max(total, 1))))
+
+for mode in modes[1:]:
+    errors = [(d, a, r) for d, a, r in zip(documents, found[mode], found["sutime"]) if a != r]
+    print("%s documents where %s disagrees with SUTime (+ only in %s, - only in SUTime)" % (len(errors), mode, mode))
+    for d, a, r in errors[:args.errors]:
+        for sign, dates in (("+", a - r), ("-", r - a)):
+            for ((start, end), uri) in sorted(dates):
+                print((u"  %s %s  %s  %s" % (sign, d.title, d.text[start:end], uri)).encode('utf-8'))
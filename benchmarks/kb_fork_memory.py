@@ -0,0 +1,83 @@
+###################################################################################
+# benchmark of the memory used by multicore_run.py style workers                 #
+# the KB is loaded once in the parent process, then a Pool of 1, 4 and 16 forked #
+# workers runs lookups on it. Each worker reports its RSS and its private memory #
+# (pages not shared with any other process, i.e. copied on write)                #
+# run from the root of the repository:                                           #
+#   python benchmarks/kb_fork_memory.py -i ./datasets/wikidata/wikidata-triples.idx
+###################################################################################
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from utils.kbstore import open_kb
+from utils.triplereader import TripleReader
+from utils.triplereaderitems import TripleReaderItems
+from utils.triplereadertriples import TripleReaderTriples
+
+parser = argparse.ArgumentParser(description='RSS per worker of a KB shared with forked workers')
+parser.add_argument('-i', '--input', help='triples csv file, compiled index folder or sqlite KB', required=True)
+parser.add_argument('-w', '--workers', help='comma separated numbers of workers', default='1,4,16')
+parser.add_argument('-n', '--lookups', type=int, help='lookups per worker', default=20000)
+args = parser.parse_args()
+
+
+def memory():
+    """
+    :return: (rss, private) memory of the current process in MB
+    """
+    rss = private = 0
+    with open("/proc/self/status") as f:
+        for l in f:
+            if l.startswith("VmRSS:"):
+                rss = int(l.split()[1])
+    smaps = "/proc/self/smaps_rollup" if os.path.exists("/proc/self/smaps_rollup") else "/proc/self/smaps"
+    with open(smaps) as f:
+        for l in f:
+            if l.startswith("Private_Clean:") or l.startswith("Private_Dirty:"):
+                private += int(l.split()[1])
+    return rss / 1024.0, private / 1024.0
+
+
+start = time.time()
+kb = open_kb(args.input)
+trip_read = TripleReader(kb)
+trip_read_items = TripleReaderItems(kb)
+trip_read_trip = TripleReaderTriples(kb)
+print("loaded %s in %.1fs, parent rss %.1f MB private %.1f MB" % ((args.input, time.time() - start) + memory()))
+
+keys = kb.subj_keys if hasattr(kb, "subj_keys") else range(1, 100000)
+entities = [kb.uri(int(keys[i])) for i in random.Random(0).sample(range(len(keys)), min(len(keys), 10000))]
+
+
+def work(seed):
+    rnd = random.Random(seed)
+    for k in range(args.lookups):
+        s = rnd.choice(entities)
+        o = rnd.choice(entities)
+        trip_read.get_many([(s, o), (o, s)])
+        list(trip_read_items.get(s))
+        trip_read_trip.get(o)
+    # leave time for the other workers to pick their own task
+    time.sleep(0.5)
+    return (os.getpid(),) + memory()
+
+
+if __name__ == '__main__':
+
+    print("%8s %12s %16s" % ("workers", "rss (MB)", "private (MB)"))
+    for w in [int(i) for i in args.workers.split(",")]:
+        p = multiprocessing.Pool(w)
+        res = dict([(r[0], r[1:]) for r in p.map(work, range(w), chunksize=1)])
+        p.close()
+        p.join()
+
+        rss = sum([r[0] for r in res.values()]) / len(res)
+        private = sum([r[1] for r in res.values()]) / len(res)
+        print("%8s %12.1f %16.1f" % (w, rss, private))
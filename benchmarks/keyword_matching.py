@@ -0,0 +1,69 @@
+###################################################################################
+# benchmark of the label matching of KeywordMatchingEntityLinker                 #
+# for each document the labels of its KB neighbours are looked for in the text   #
+# with one regex scan per label (the former implementation) and with one pass of #
+# an Aho-Corasick automaton over all of them, both results are checked to agree  #
+# run from the root of the repository:                                           #
+#   python benchmarks/keyword_matching.py -d ./datasets/wikipedia-abstracts/csv/dbpedia-abstracts.csv \
+#       -m ./datasets/wikidata/dbpedia-wikidata-sameas-dict.csv \
+#       -k ./datasets/wikidata/wikidata-triples.idx -l ./datasets/wikidata/wikidata-labels.idx
+###################################################################################
+
+import argparse
+import itertools
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pipeline.datareader import DBpediaAbstractsDataReader
+from utils.kbstore import open_kb
+from utils.triplereaderitems import TripleReaderItems
+from utils.labelreader import LabelReader
+from utils.matching import delimited_matches, delimited_matches_regex
+
+parser = argparse.ArgumentParser(description='regex vs Aho-Corasick label matching of KeywordMatchingEntityLinker')
+parser.add_argument('-d', '--dataset', help='DBpedia abstracts csv file', required=True)
+parser.add_argument('-m', '--mapping', help='DBpedia to Wikidata uri mapping file of the dataset')
+parser.add_argument('-k', '--kb', help='triples csv file, compiled index folder or sqlite KB', required=True)
+parser.add_argument('-l', '--labels', help='labels csv file, label index folder or sqlite KB', required=True)
+parser.add_argument('--lang', default='en', help='language of the labels')
+parser.add_argument('-n', '--documents', type=int, default=1000, help='number of documents')
+args = parser.parse_args()
+
+items = TripleReaderItems(open_kb(args.kb))
+labels = LabelReader(args.labels, args.lang)
+reader = DBpediaAbstractsDataReader(args.dataset, db_wd_mapping=args.mapping)
+
+docs = 0
+candidates = 0
+matches = 0
+mismatches = 0
+t_regex = 0.0
+t_automaton = 0.0
+
+for uri, title, text in itertools.islice(reader.read_rows(), args.documents):
+    text = text.decode('utf-8').lower()
+    xs = [x.lower() for u in items.get(uri) for x in labels.get(u)]
+
+    start = time.time()
+    regex = [delimited_matches_regex(text, x) for x in xs]
+    t_regex += time.time() - start
+
+    start = time.time()
+    automaton = delimited_matches(text, xs)
+    t_automaton += time.time() - start
+
+    for x, spans in zip(xs, regex):
+        matches += len(spans)
+        if automaton[x] != spans:
+            mismatches += 1
+
+    docs += 1
+    candidates += len(xs)
+
+print("%s documents, %s candidate labels, %s matches, %s mismatches" % (docs, candidates, matches, mismatches))
+print("regex:         %.3fs  %.1f docs/s" % (t_regex, docs / max(t_regex, 1e-9)))
+print("aho-corasick:  %.3fs  %.1f docs/s" % (t_automaton, docs / max(t_automaton, 1e-9)))
+print("speedup:       %.1fx" % (t_regex / max(t_automaton, 1e-9)))
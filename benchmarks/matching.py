@@ -0,0 +1,85 @@
+###################################################################################
+# benchmark of the multi-pattern search of utils/matching.py                     #
+# the labels of the KB neighbours of each abstract (or the property labels with  #
+# -p) are searched with one regex scan per label, with Aho-Corasick and with      #
+# multi-pattern Rabin-Karp, the three results are checked to agree               #
+# run from the root of the repository:                                           #
+#   python benchmarks/matching.py -d ./datasets/wikipedia-abstracts/csv/dbpedia-abstracts.csv \
+#       -m ./datasets/wikidata/dbpedia-wikidata-sameas-dict.csv \
+#       -k ./datasets/wikidata/wikidata-triples.idx -l ./datasets/wikidata/wikidata-labels.idx -i -w
+###################################################################################
+
+import argparse
+import csv
+import itertools
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pipeline.datareader import DBpediaAbstractsDataReader
+from utils.kbstore import open_kb
+from utils.triplereaderitems import TripleReaderItems
+from utils.labelreader import LabelReader
+from utils.matching import PatternSet, find_all_regex, MATCHERS
+
+parser = argparse.ArgumentParser(description='regex vs Aho-Corasick vs Rabin-Karp multi-pattern search')
+parser.add_argument('-d', '--dataset', help='DBpedia abstracts csv file', required=True)
+parser.add_argument('-m', '--mapping', help='DBpedia to Wikidata uri mapping file of the dataset')
+parser.add_argument('-k', '--kb', help='triples csv file, compiled index folder or sqlite KB')
+parser.add_argument('-l', '--labels', help='labels csv file, label index folder or sqlite KB')
+parser.add_argument('-p', '--properties', help='search the labels of this wikidata-properties.csv file in every document instead')
+parser.add_argument('--lang', default='en', help='language of the labels')
+parser.add_argument('-n', '--documents', type=int, default=1000, help='number of documents')
+parser.add_argument('-i', '--ignore-case', action='store_true', help='case insensitive search')
+parser.add_argument('-w', '--word-boundaries', action='store_true', help='only whole words (regex \\b)')
+args = parser.parse_args()
+
+if args.properties:
+    with open(args.properties) as f:
+        properties = [l[2].decode('utf-8') for l in csv.reader(f, delimiter='\t')]
+elif args.kb and args.labels:
+    items = TripleReaderItems(open_kb(args.kb))
+    labels = LabelReader(args.labels, args.lang)
+else:
+    parser.error('either -p or both -k and -l are needed')
+
+reader = DBpediaAbstractsDataReader(args.dataset, db_wd_mapping=args.mapping)
+options = (args.ignore_case, args.word_boundaries)
+# the property labels are the same for every document, they are compiled once
+if args.properties:
+    compiled = dict((name, PatternSet(properties, *options, algorithm=name)) for name in MATCHERS)
+
+docs = 0
+candidates = 0
+matches = 0
+mismatches = dict((name, 0) for name in MATCHERS)
+times = dict((name, 0.0) for name in ["regex"] + list(MATCHERS))
+
+for uri, title, text in itertools.islice(reader.read_rows(), args.documents):
+    text = text.decode('utf-8')
+    patterns = properties if args.properties else [x for u in items.get(uri) for x in labels.get(u)]
+
+    start = time.time()
+    regex = find_all_regex(text, patterns, *options)
+    times["regex"] += time.time() - start
+
+    for name in MATCHERS:
+        start = time.time()
+        if args.properties:
+            res = compiled[name].find_all(text)
+        else:
+            res = PatternSet(patterns, *options, algorithm=name).find_all(text)
+        times[name] += time.time() - start
+        mismatches[name] += sum([1 for p in regex if res[p] != regex[p]])
+
+    docs += 1
+    candidates += len(patterns)
+    matches += sum([len(spans) for spans in regex.values()])
+
+print("%s documents, %s patterns, %s matches" % (docs, candidates, matches))
+for name in ["regex"] + sorted(MATCHERS):
+    print("%-14s %.3fs  %.1f docs/s  %.1fx  %s mismatches" % (
+        name + ":", times[name], docs / max(times[name], 1e-9),
+        times["regex"] / max(times[name], 1e-9), mismatches.get(name, 0)))
@@ -0,0 +1,81 @@
+###################################################################################
+# benchmark of the DBpedia Spotlight client                                      #
+# the abstracts are annotated one sentence at a time as the former linkers did,  #
+# with concurrent requests per sentence and with concurrent requests per         #
+# document, against a running service (-u) or the stub of spotlight_stub.py      #
+# with --cache the documents are annotated again from the cache file            #
+# --astral puts a character outside the BMP in every sentence, entities whose    #
+# boundaries do not give back their surface form are counted as misplaced        #
+# run from the root of the repository:                                           #
+#   python benchmarks/spotlight.py -d ./datasets/wikipedia-abstracts/csv/dbpedia-abstracts.csv --delay 0.005
+###################################################################################
+
+import argparse
+import itertools
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pipeline.pipeline import Document
+from pipeline.datareader import DBpediaAbstractsDataReader
+from pipeline.entitylinker import DBSpotlightEntityLinker
+from spotlight_stub import SpotlightStubServer
+
+parser = argparse.ArgumentParser(description='sequential vs concurrent Spotlight annotation')
+parser.add_argument('-d', '--dataset', help='DBpedia abstracts csv file', required=True)
+parser.add_argument('-u', '--url', help='url of a Spotlight annotate service, a local stub is started by default')
+parser.add_argument('-n', '--documents', type=int, default=200, help='number of documents')
+parser.add_argument('-c', '--concurrency', type=int, default=8, help='max number of requests at once')
+parser.add_argument('--delay', type=float, default=0.005, help='latency of each request of the stub in seconds')
+parser.add_argument('--fail', type=float, default=0.0, help='fraction of the stub requests answered with a 503')
+parser.add_argument('--cache', help='annotation cache file, filled and then read by the per document mode')
+parser.add_argument('--astral', action='store_true', help='start every sentence with a character outside the BMP')
+args = parser.parse_args()
+
+server = None
+url = args.url
+if url is None:
+    server = SpotlightStubServer(0, args.delay, args.fail).start()
+    url = server.url()
+
+reader = DBpediaAbstractsDataReader(args.dataset)
+documents = list(itertools.islice(reader.read_documents(), args.documents))
+if args.astral:
+    documents = [Document(d.docid, d.title, d.uri,
+                          u"".join([u"\U0001F600 " + d.text[start:end] + d.text[end:next_start] for (start, end), next_start
+                                    in zip(d.sentences_boundaries, [s for s, e in d.sentences_boundaries[1:]] + [len(d.text)])]))
+                 for d in documents]
+
+modes = [("sentence, sequential", 1, True),
+         ("sentence, concurrent", args.concurrency, True),
+         ("document, concurrent", args.concurrency, False)]
+if args.cache:
+    modes += [("document, cache fill", args.concurrency, False), ("document, cache read", args.concurrency, False)]
+results = []
+for name, concurrency, per_sentence in modes:
+    linker = DBSpotlightEntityLinker(url, concurrency=concurrency, per_sentence=per_sentence,
+                                     cache_file=args.cache if "cache" in name else None)
+    for d in documents:
+        d.entities = []
+    start = time.time()
+    if concurrency == 1:
+        for d in documents:
+            linker.run(d)
+    else:
+        linker.run_batch(documents)
+    elapsed = time.time() - start
+    results.append([[(e.uri, e.boundaries, e.surfaceform) for e in d.entities] for d in documents])
+    misplaced = sum([d.text[e.boundaries[0]:e.boundaries[1]] != e.surfaceform for d in documents for e in d.entities])
+    print("%-22s %.2fs  %.1f docs/s  %s requests  %s retried  %s entities  %s misplaced  %s" % (
+        name + ":", elapsed, len(documents) / max(elapsed, 1e-9), linker.client.requests, linker.client.retried,
+        sum([len(d.entities) for d in documents]), misplaced,
+        "same entities" if results[-1] == results[0] else "DIFFERENT entities"))
+    if linker.cache is not None:
+        print("%-22s %s hits  %s misses  %s texts cached" % ("", linker.cache.stats()["hits"],
+                                                            linker.cache.stats()["misses"], len(linker.cache)))
+    linker.client.close()
+
+if server is not None:
+    print("stub served %s requests" % server.requests)
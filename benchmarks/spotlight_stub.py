@@ -0,0 +1,111 @@
+###################################################################################
+# stub of the DBpedia Spotlight annotate service, to test the Spotlight linkers   #
+# offline: every capitalized word is annotated as http://dbpedia.org/resource/W  #
+# the annotations of a text do not depend on its context, so one request per    #
+# document gives the same entities as one per sentence. Offsets are in utf-16    #
+# units as java gives them, a character outside the BMP counts for two           #
+#   python benchmarks/spotlight_stub.py -p 2222 --delay 0.01 --fail 0.05         #
+#   --bad 0.01 answers some requests with an html page instead of json           #
+###################################################################################
+
+import argparse
+import BaseHTTPServer
+import json
+import random
+import re
+import SocketServer
+import threading
+import time
+import urlparse
+
+WORD = re.compile(r"\b[A-Z]\w+", re.UNICODE)
+
+
+def utf16_offset(text, i):
+    return len(text[:i].encode("utf-16-le")) // 2
+
+
+def annotate(text, confidence, support):
+    return {"@text": text, "@confidence": str(confidence), "@support": str(support),
+            "Resources": [{"@URI": "http://dbpedia.org/resource/%s" % m.group(),
+                           "@support": str(len(m.group()) * 10),
+                           "@types": "",
+                           "@surfaceForm": m.group(),
+                           "@offset": str(utf16_offset(text, m.start())),
+                           "@similarityScore": "0.9",
+                           "@percentageOfSecondRank": "0.1"} for m in WORD.finditer(text)]}
+
+
+class SpotlightStubHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    # keep-alive connections, each response written in one send
+    protocol_version = "HTTP/1.1"
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+        form = urlparse.parse_qs(self.rfile.read(int(self.headers.getheader("Content-Length", 0))))
+        if server.delay:
+            time.sleep(server.delay)
+        if server.fail and random.random() < server.fail:
+            return self.reply(503, "unavailable")
+        if server.bad and random.random() < server.bad:
+            return self.reply(200, "<html><body>proxy error</body></html>")
+
+        text = form.get("text", [""])[0].decode("utf-8")
+        self.reply(200, json.dumps(annotate(text, form.get("confidence", ["0.2"])[0], form.get("support", ["1"])[0])))
+
+    def reply(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SpotlightStubServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, delay=0.0, fail=0.0, bad=0.0):
+        """
+        :param port: 0 for any free port, see self.server_address
+        :param delay: seconds of latency added to each request
+        :param fail: fraction of the requests answered with a 503
+        :param bad: fraction of the requests answered with a 200 and a body that is not json
+        """
+        BaseHTTPServer.HTTPServer.__init__(self, ("localhost", port), SpotlightStubHandler)
+        self.delay = delay
+        self.fail = fail
+        self.bad = bad
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def url(self):
+        return "http://localhost:%s/rest/annotate" % self.server_address[1]
+
+    def start(self):
+        """
+        serve in a background thread
+        """
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='stub DBpedia Spotlight server')
+    parser.add_argument('-p', '--port', type=int, default=2222, help='port')
+    parser.add_argument('--delay', type=float, default=0.0, help='seconds of latency of each request')
+    parser.add_argument('--fail', type=float, default=0.0, help='fraction of requests answered with a 503')
+    parser.add_argument('--bad', type=float, default=0.0, help='fraction of requests answered with a 200 and html')
+    args = parser.parse_args()
+
+    server = SpotlightStubServer(args.port, args.delay, args.fail, args.bad)
+    print("stub spotlight on %s" % server.url())
+    server.serve_forever()
@@ -0,0 +1,38 @@
+######################################################################################
+# script to compile a wikidata triples csv file into a memory mapped binary index   #
+# the index folder can be given to TripleReader, TripleReaderItems and              #
+# TripleReaderTriples instead of the csv file                                       #
+# with --sqlite the triples (and labels) are written to a disk backed sqlite KB     #
+# instead, for machines where they do not fit in memory                            #
+######################################################################################
+
+import argparse
+import time
+from utils.kbstore import KBStore
+from utils.kbindex import compile_kb
+from utils.kbsqlite import build_sqlite_kb
+from utils.properties import read_properties
+
+parser = argparse.ArgumentParser(description='script to compile a wikidata triples csv file into a binary index')
+parser.add_argument('-i', '--input', help='wikidata triples csv file', required=True)
+parser.add_argument('-o', '--out', help='output folder of the index', required=True)
+parser.add_argument('-p', '--properties', help='only keep the properties of this file (e.g. datasets/properties/most-used-wikidata.csv)')
+parser.add_argument('-k', '--top', type=int, help='only keep the k most used properties of the properties file')
+parser.add_argument('--sqlite', action='store_true', help='write a sqlite KB file instead of a memory mapped index')
+parser.add_argument('-l', '--labels', help='wikidata labels csv file to add to the sqlite KB')
+args = parser.parse_args()
+
+start = time.time()
+
+if args.sqlite:
+    build_sqlite_kb(args.out, args.input, args.labels)
+    print("sqlite KB written to %s in %.1fs" % (args.out, time.time() - start))
+
+else:
+    properties = read_properties(args.properties, args.top) if args.properties else None
+
+    kb = KBStore(args.input, properties=properties)
+    print("loaded %s triples in %.1fs" % (len(kb), time.time() - start))
+
+    compile_kb(kb, args.out)
+    print("index written to %s in %.1fs" % (args.out, time.time() - start))
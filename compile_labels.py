@@ -0,0 +1,29 @@
+######################################################################################
+# script to compile a wikidata labels csv file into a memory mapped label index     #
+# partitioned by language, the index folder can be given to LabelReader instead    #
+# of the csv file, with -s the surface form dictionary of SurfaceFormEntityLinker  #
+# is written too                                                                    #
+######################################################################################
+
+import argparse
+import time
+from utils.labelindex import compile_labels
+from utils.labelreader import LabelReader
+from utils.surfaceforms import SurfaceFormIndex
+
+parser = argparse.ArgumentParser(description='script to compile a wikidata labels csv file into a binary index')
+parser.add_argument('-i', '--input', help='wikidata labels csv file', required=True)
+parser.add_argument('-o', '--out', help='output folder of the index', required=True)
+parser.add_argument('-w', '--workers', type=int, help='number of processes parsing the labels file (default: one per core)')
+parser.add_argument('-s', '--surface-forms', help='also write the surface form dictionary of SurfaceFormEntityLinker to this folder')
+parser.add_argument('--lang', default='en', help='language of the surface form dictionary')
+args = parser.parse_args()
+
+start = time.time()
+compile_labels(args.input, args.out, workers=args.workers)
+print("label index written to %s in %.1fs" % (args.out, time.time() - start))
+
+if args.surface_forms:
+    surface_forms = SurfaceFormIndex.build(LabelReader(args.out, args.lang, enable_fallback=True))
+    surface_forms.save(args.surface_forms)
+    print("%s surface forms written to %s in %.1fs" % (len(surface_forms), args.surface_forms, time.time() - start))
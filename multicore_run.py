@@ -4,44 +4,62 @@ from pipeline.triplealigner import *
 from pipeline.datareader import DBpediaAbstractsDataReader
 from pipeline.writer import JsonWriter
 from pipeline.coreference import *
+from utils.kbstore import *
 from utils.triplereader import *
+from utils.spotlight import SpotlightError
 import argparse
+import itertools
+import os
 
 __START_DOC__ = 0   #start reading from document number
 __CORES__ = 7
+__LAZY_PROPERTIES__ = False   # True: properties linked by SPOAligner only in the sentences with entity pairs,
+                              # faster but the other sentences get no Wikidata_Property_Linker entities
+__DATE_WORKERS__ = 3   # SUTime processes, each with its own JVM
+__BATCH__ = 20   # documents given to a worker at once, linked by Spotlight and prefetched together
+# a compiled index (compile_kb.py) is memory mapped, the page cache holds one copy for all the workers
+__KB__ = './datasets/wikidata/wikidata-triples.idx' if os.path.isdir('./datasets/wikidata/wikidata-triples.idx') else './datasets/wikidata/wikidata-triples.csv'
 # Reading the DBpedia Abstracts Dataset
 reader = DBpediaAbstractsDataReader('./datasets/wikipedia-abstracts/csv/dbpedia-abstracts.csv', db_wd_mapping='./datasets/wikidata/dbpedia-wikidata-sameas-dict.csv', skip=__START_DOC__)
 
 # Loading the WikidataSpotlightEntityLinker ... DBpedia Spotlight with mapping DBpedia URIs to Wikidata
-link = WikidataSpotlightEntityLinker('./datasets/wikidata/dbpedia-wikidata-sameas-dict.csv', support=10, confidence=0.4)
+# the annotations are cached on disk, texts annotated by a previous run are not sent again
+# each worker sends the requests of its batch concurrently, __CORES__ * concurrency of them at once overall
+link = WikidataSpotlightEntityLinker('./datasets/wikidata/dbpedia-wikidata-sameas-dict.csv', support=10, confidence=0.4,
+                                     concurrency=4, cache_file='./datasets/spotlight-cache.sqlite')
 
 coref = SimpleCoreference()
-trip_read = TripleReader('./datasets/wikidata/wikidata-triples.csv')
+# the KB is a few flat arrays, so the forked workers read it without copying it on write
+kb = open_kb(__KB__)
+trip_read = TripleReader(kb)
 Salign = SimpleAligner(trip_read)
 prop = WikidataPropertyLinker('./datasets/wikidata/wikidata-properties.csv')
-date = DateLinker()
-SPOalign = SPOAligner(trip_read)
+# the SUTime JVMs live in the date linker worker processes, not in this one or the pool workers
+date = DateLinker(workers=__DATE_WORKERS__)
+SPOalign = SPOAligner(trip_read, prop if __LAZY_PROPERTIES__ else None)
 NSalign = NoSubjectAlign(trip_read)
 writer = JsonWriter('./out', "re-nlg", startfile=__START_DOC__)
 
 
-def reading_documents():
-    # reading document and apply all non parallelizable process
+def reading_batches():
+    # reading document and linking their dates in batches with the SUTime worker processes
+    # the documents come out in the order of the reader, __BATCH__ at a time
 
-    for d in reader.read_documents():
-        d = date.run(d)                     # SU Time is non parallelizable
-        yield d
+    documents = date.imap(reader.read_documents())
+    for batch in iter(lambda: list(itertools.islice(documents, __BATCH__)), []):
+        yield batch
 
-def multhithreadprocess(d):
+def multhithreadprocess(d, linked=False):
 
     try:
 
-        d = link.run(d)
+        if not linked:
+            d = link.run(d)
         d = NSalign.run(d)
         d = coref.run(d)
-        d = date.run(d)
         d = Salign.run(d)
-        d = prop.run(d)
+        if not __LAZY_PROPERTIES__:
+            d = prop.run(d)
         d = SPOalign.run(d)
         writer.run(d)
         print "Document Title: %s \t Number of Annotated Entities %s \t Number of Annotated Triples %s" % (d.title, len(d.entities), len(d.triples))
@@ -50,8 +68,32 @@ def multhithreadprocess(d):
 
         print "error Processing document %s" % d.title
 
+def process_batch(batch):
+
+    hits, misses = link.cache.hits, link.cache.misses
+
+    # link the entities of the batch with concurrent Spotlight requests, one document at a time if the
+    # service keeps failing so that only the documents it fails on are lost
+    try:
+        batch = link.run_batch(batch)
+        linked = True
+    except SpotlightError:
+        linked = False
+
+    # load the entities of the batch at once in this worker when the KB is disk backed (compile_kb.py --sqlite)
+    trip_read.prefetch(set([d.uri for d in batch] + [e.uri for d in batch for e in d.entities]))
+    for d in batch:
+        multhithreadprocess(d, linked)
+
+    # the cache counters live in this worker: the ones of the batch are returned to the main process
+    link.cache.flush()
+    return link.cache.hits - hits, link.cache.misses - misses
+
 if __name__ == '__main__':
 
     p = multiprocessing.Pool(__CORES__)
-    p.map(multhithreadprocess, reading_documents())
+    counts = p.map(process_batch, reading_batches())
+    date.close()
+    hits, misses = sum([h for h, m in counts]), sum([m for h, m in counts])
+    print "Spotlight cache: %s hits, %s misses, hit rate %.4f" % (hits, misses, hits / float(max(hits + misses, 1)))
 
@@ -33,10 +33,10 @@ class DBpediaAbstractsDataReader:
         else:
             self.mappings = None
 
-    def read_documents(self):
+    def read_rows(self):
         """
-        function that yields iterator of documents
-        the URI of each document is the Knowledge base URI after being mapped
+        function that yields the (uri, title, text) rows of the dataset file
+        the URI of each row is the Knowledge base URI after being mapped
         """
         with open(self.dataset_file) as f:
             read = csv.reader(f, delimiter="\t")
@@ -59,14 +59,31 @@ class DBpediaAbstractsDataReader:
                 elif 'wikidata.dbpedia.org' in l[0]:
                     l[0] = l[0].replace("http://wikidata.dbpedia.org/resource/", "http://www.wikidata.org/entity/")
 
-                document = Document(
-                    docid=l[0],
-                    pageuri=l[0],
-                    title=title,
-                    text=l[1].decode('utf-8')
-                )
+                yield l[0], title, l[1]
+
+    def read_documents(self):
+        """
+        function that yields iterator of documents
+        the URI of each document is the Knowledge base URI after being mapped
+        """
+        for uri, title, text in self.read_rows():
+
+            document = Document(
+                docid=uri,
+                pageuri=uri,
+                title=title,
+                text=text.decode('utf-8')
+            )
+
+            yield document
 
-                yield document
+    def read_uris(self):
+        """
+        function that yields the URI of each document that read_documents would yield
+        without building the documents, e.g. to load only the part of the knowledge base they need
+        """
+        for uri, title, text in self.read_rows():
+            yield uri
 
 
 class TRExDataReader:
@@ -111,9 +128,9 @@ class TRExDataReader:
             self.mappings = None
 
 
-    def read_documents(self):
+    def read_json(self):
         """
-        function that yields iterator of documents
+        function that yields the json of each document to read
         the URI of each document is the Knowledge base URI after being mapped
         """
 
@@ -139,9 +156,24 @@ class TRExDataReader:
                     else:
                         continue
 
-                document = Document.fromJSON(d)
+                yield d
+
+    def read_documents(self):
+        """
+        function that yields iterator of documents
+        the URI of each document is the Knowledge base URI after being mapped
+        """
+        for d in self.read_json():
+            document = Document.fromJSON(d)
+
+            yield document
 
-                yield document
+    def read_uris(self):
+        """
+        function that yields the URI of each document that read_documents would yield
+        """
+        for d in self.read_json():
+            yield d['uri']
 
 
 
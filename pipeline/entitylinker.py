@@ -1,56 +1,70 @@
 # -*- coding: utf-8 -*-
 
 from pipeline import *
-#import spotlight
 import csv
 import re
 import json
 import os
+import sys
+import bisect
+import functools
+import itertools
+from collections import deque
 from sutime import SUTime
+from utils.matching import delimited_matches, PatternSet
+from utils.lrucache import LRUCache
+from utils.dates import recognize_dates, date_uri, DATE_VALUE
+from utils.parserpool import ParserPool
+from utils.spotlight import SpotlightClient
+from utils.spotlightcache import SpotlightCache
 
-'''
-class DBSpotlightEntityLinker(BasePipeline):
 
-    def __init__(self, spotlight_url='http://localhost:2222/rest/annotate', confidence=0.2, support=1):
+class SpotlightEntityLinker(BasePipeline):
+    """
+    base of the DBpedia Spotlight entity linkers: the documents are annotated by a SpotlightClient,
+    by default with one request per document whose annotations are split between its sentences
+    """
+
+    def __init__(self, spotlight_url='http://localhost:2222/rest/annotate', confidence=0.2, support=1,
+                 concurrency=8, per_sentence=False, cache_file=None):
         """
         :param spotlight_url: url of the dbpedia spotlight service
         :param confidence: min confidence
         :param support:  min supporting document
+        :param concurrency: max number of requests at once in run_batch
+        :param per_sentence: one request per sentence instead of one per document
+        :param cache_file: sqlite file of the annotations already requested, shared by the processes and
+        runs using it, None for no cache
         """
-        self.annotator_name = 'DBpedia_spotlight'
         self.spotlight_url = spotlight_url
         self.confidence = confidence
         self.support = support
+        self.per_sentence = per_sentence
+        self.cache = SpotlightCache(cache_file) if cache_file is not None else None
+        self.client = SpotlightClient(spotlight_url, confidence, support, concurrency, cache=self.cache)
 
-    def run(self, document):
+    def uri(self, ann):
         """
-        :param document: Document object
-        :return: Document after being annotated
+        :return: uri of the entity of an annotation, None to skip it
         """
+        return ann['URI']
 
-        #document.entities = []
-
-        for sid, (start, end) in enumerate(document.sentences_boundaries):
-
-            try:
-                annotations = spotlight.annotate(self.spotlight_url,
-                                                 document.text[start:end],
-                                                 self.confidence,
-                                                 self.support)
+    def link(self, document, annotations):
+        """
+        :param annotations: list of the annotations of each sentence
+        """
+        for sid, sentence_annotations in enumerate(annotations):
 
-            except Exception as e:
-                annotations = []
+            for ann in sentence_annotations:
 
-            for ann in annotations:
+                uri = self.uri(ann)
+                if uri is None:
+                    continue
 
                 e_start = document.sentences_boundaries[sid][0] + ann['offset']
-
-                if type(ann['surfaceForm']) not in [str, unicode]:
-                    ann['surfaceForm'] = str(ann['surfaceForm'])
-
                 e_end = e_start + len(ann['surfaceForm'])
 
-                entity = Entity(ann['URI'],
+                entity = Entity(uri,
                                 boundaries=(e_start, e_end),
                                 surfaceform=ann['surfaceForm'],
                                 annotator=self.annotator_name)
@@ -59,8 +73,36 @@ class DBSpotlightEntityLinker(BasePipeline):
 
         return document
 
+    def run(self, document):
+        """
+        :param document: Document object
+        :return: Document after being annotated, raises SpotlightError if the service keeps failing
+        """
+        return self.run_batch([document])[0]
+
+    def run_batch(self, documents):
+        """
+        annotate many documents with concurrent requests
+        :return: list of the documents
+        """
+        for document, annotations in zip(documents, self.client.annotate_documents(documents, self.per_sentence)):
+            self.link(document, annotations)
+        return documents
+
 
-class DBSpotlightEntityAndTypeLinker(BasePipeline):
+class DBSpotlightEntityLinker(SpotlightEntityLinker):
+
+    def __init__(self, spotlight_url='http://localhost:2222/rest/annotate', confidence=0.2, support=1, **kwargs):
+        """
+        :param spotlight_url: url of the dbpedia spotlight service
+        :param confidence: min confidence
+        :param support:  min supporting document
+        """
+        SpotlightEntityLinker.__init__(self, spotlight_url, confidence, support, **kwargs)
+        self.annotator_name = 'DBpedia_spotlight'
+
+
+class DBSpotlightEntityAndTypeLinker(SpotlightEntityLinker):
     """
     Since DBpedia spotlight only tag resources not types
     for example the sentence :
@@ -71,76 +113,39 @@ class DBSpotlightEntityAndTypeLinker(BasePipeline):
     This Entity linker tries to alleviate that by searching is the resource matches a DBpedia ontology class
     """
 
-    def __init__(self, dbo_file, dict_file, spotlight_url='http://localhost:2222/rest/annotate', confidence=0.2, support=1):
+    def __init__(self, dbo_file, dict_file, spotlight_url='http://localhost:2222/rest/annotate', confidence=0.2, support=1,
+                 **kwargs):
         """
         :param dbo_file:  file path containing all valid dbpedia classes, default ./datasets/dbpedia/dbpedia-classes.txt
         :param spotlight_url: url of the dbpedia spotlight service
         :param confidence: min confidence
         :param support:  min supporting document
         """
+        SpotlightEntityLinker.__init__(self, spotlight_url, confidence, support, **kwargs)
         self.annotator_name = 'DBpedia-spotlight-Entity-Type-Linker'
-        self.spotlight_url = spotlight_url
-        self.confidence = confidence
-        self.support = support
         with open(dbo_file) as f:
             self.dbo_classes = set([i.strip() for i in f.readlines()])
 
-    def run(self, document):
-        """
-        :param document: Document object
-        :return: Document after being annotated
-        """
-
-        #document.entities = []
-
-        for sid, (start, end) in enumerate(document.sentences_boundaries):
+    def uri(self, ann):
+        # give priority to Tag DBpedia classes if they are tagged.
+        tmp = ann['URI'].replace("resource", "ontology")
+        if tmp in self.dbo_classes:
+            return tmp
+        return ann['URI']
 
-            try:
-                annotations = spotlight.annotate(self.spotlight_url,
-                                                 document.text[start:end],
-                                                 self.confidence,
-                                                 self.support)
 
-            except Exception as e:
-                annotations = []
+class WikidataSpotlightEntityLinker(SpotlightEntityLinker):
 
-            for ann in annotations:
-
-                e_start = document.sentences_boundaries[sid][0] + ann['offset']
-
-                if type(ann['surfaceForm']) not in [str, unicode]:
-                    ann['surfaceForm'] = str(ann['surfaceForm'])
-
-                e_end = e_start + len(ann['surfaceForm'])
-
-                # give priority to Tag DBpedia classes if they are tagged.
-                tmp = ann['URI'].replace("resource", "ontology")
-                if tmp in self.dbo_classes:
-                    ann['URI'] = tmp
-
-                entity = Entity(ann['URI'],
-                                boundaries=(e_start, e_end),
-                                surfaceform=ann['surfaceForm'],
-                                annotator=self.annotator_name)
-
-                document.entities.append(entity)
-
-        return document
-
-
-class WikidataSpotlightEntityLinker(BasePipeline):
-
-    def __init__(self, db_wd_mapping, spotlight_url='http://localhost:2222/rest/annotate', confidence=0.2, support=1):
+    def __init__(self, db_wd_mapping, spotlight_url='http://localhost:2222/rest/annotate', confidence=0.2, support=1,
+                 **kwargs):
         """
         :param db_wd_mapping: csv file name containing mappings between DBpedia URIS and Wikdiata URIS
         :param spotlight_url: url of the dbpedia spotlight service
         :param confidence: min confidence
         :param support:  min supporting document
         """
+        SpotlightEntityLinker.__init__(self, spotlight_url, confidence, support, **kwargs)
         self.annotator_name = 'Wikidata_Spotlight_Entity_Linker'
-        self.spotlight_url = spotlight_url
-        self.confidence = confidence
-        self.support = support
 
         self.mappings = {}
         with open(db_wd_mapping) as f:
@@ -148,157 +153,336 @@ class WikidataSpotlightEntityLinker(BasePipeline):
                 tmp = l.split("\t")
                 self.mappings[tmp[0].strip()] = tmp[1].strip()
 
-    def run(self, document):
+    def uri(self, ann):
+        # change DBpedia URI to Wikidata URI
+        return self.mappings.get(ann['URI'])
+
+
+class WikidataPropertyLinker(BasePipeline):
+
+    stop_words = frozenset(["i", "me", "my", "myself", "we", "our", "ours", "ourselves", "you", "your", "yours", "yourself",
+                            "yourselves", "he", "him", "his", "himself", "she", "her", "hers", "herself", "it", "its",
+                            "itself", "they", "them", "their", "theirs", "themselves", "what", "which", "who", "whom", "this",
+                            "that", "these", "those", "am", "is", "are", "was", "were", "be", "been", "being", "have", "has",
+                            "had", "having", "do", "does", "did", "doing", "a", "an", "the", "and", "but", "if", "or",
+                            "because", "as", "until", "while", "of", "at", "by", "for", "with", "about", "against", "between",
+                            "into", "through", "during", "before", "after", "above", "below", "to", "from", "up", "down",
+                            "in", "out", "on", "off", "over", "under", "again", "further", "then", "once", "here", "there",
+                            "when", "where", "why", "how", "all", "any", "both", "each", "few", "more", "most", "other",
+                            "some", "such", "no", "nor", "not", "only", "own", "same", "so", "than", "too", "very", "s", "t",
+                            "can", "will", "just", "don", "should", "now"])
+
+    def __init__(self, wd_prop_mapping, cache_size=10000):
         """
-        :param document: Document object
-        :return: Document after being annotated
+        :param wd_prop_mapping: wikidata-properties.csv file of the property labels
+        :param cache_size: number of automata of sets of properties kept by the lazy mode (link)
         """
+        self.annotator_name = 'Wikidata_Property_Linker'
+
+        self.mappings = {}
+        with open(wd_prop_mapping) as f:
+            for l in csv.reader(f, delimiter='\t'):
+                self.mappings[l[2]] = l[0]
 
-        #document.entities = []
+        # a match is the label itself, so labels that are stop words can never be linked
+        self.labels = [prop for prop in self.mappings.keys() if prop not in self.stop_words]
+        # all the labels searched at once, as the former "\b" + re.escape(prop) + "\b" scans
+        self.patterns = PatternSet(self.labels, word_boundaries=True, unicode=False)
 
-        for sid, (start, end) in enumerate(document.sentences_boundaries):
+        # lazy mode: labels of each property and the automata of the last sets of properties linked
+        self.rank = dict((prop, i) for i, prop in enumerate(self.labels))
+        self.property_labels = {}
+        for prop in self.labels:
+            self.property_labels.setdefault(self.mappings[prop], []).append(prop)
+        self.property_patterns = LRUCache(cache_size)
 
-            try:
-                annotations = spotlight.annotate(self.spotlight_url,
-                                                 document.text[start:end],
-                                                 self.confidence,
-                                                 self.support)
+    def entities(self, document, labels, matches):
+        """
+        :return: the entities of the matches of the labels, in the order of self.labels
+        """
+        entities = []
+        for prop in sorted(labels, key=self.rank.get):
+            for (start, end) in matches[prop]:
+                entity = Entity(self.mappings[document.text[start:end]],
+                                boundaries=(start, end),
+                                surfaceform=document.text[start:end],
+                                annotator=self.annotator_name)
+                entities.append(entity)
+        return entities
 
-            except Exception as e:
-                annotations = []
+    def run(self, document):
+        matches = self.patterns.find_all(document.text)
+        document.entities.extend(self.entities(document, self.labels, matches))
+        return document
 
-            for ann in annotations:
+    def link(self, document, start, end, properties):
+        """
+        lazy mode: link the labels of some properties in one sentence only, on demand of SPOAligner
+        :param start: start of the sentence in document.text
+        :param end: end of the sentence
+        :param properties: uris of the properties whose labels are looked for
+        :return: the new entities, also added to document.entities
+        """
+        properties = frozenset([uri for uri in properties if uri in self.property_labels])
+        if not properties:
+            return []
+        patterns = self.property_patterns.get(properties)
+        if patterns is None:
+            patterns = PatternSet([prop for uri in properties for prop in self.property_labels[uri]],
+                                  word_boundaries=True, unicode=False)
+            self.property_patterns.put(properties, patterns)
+
+        entities = self.entities(document, patterns.patterns, patterns.find_all(document.text, start, end))
+        document.entities.extend(entities)
+        return entities
 
-                e_start = document.sentences_boundaries[sid][0] + ann['offset']
+class KeywordMatchingEntityLinker(BasePipeline):
 
-                if type(ann['surfaceForm']) not in [str, unicode]:
-                    ann['surfaceForm'] = str(ann['surfaceForm'])
+    # words of a label, as WordPunctTokenizer splits them in the document
+    words = re.compile(r"\w+", re.UNICODE)
 
-                e_end = e_start + len(ann['surfaceForm'])
+    def __init__(self, trip_read_items, label_read, cache_size=100000):
+        """
+        :param trip_read_items: TripleReaderItems giving the neighbourhood of the document
+        :param label_read: LabelReader
+        :param cache_size: number of entities whose lowercased labels are kept across documents, 0 to disable
+        """
+        self.annotator_name = 'Keyword_Matching_Entity_Linker'
+        self.trip_read_items = trip_read_items
+        self.label_read = label_read
+        # popular neighbours (countries, occupations, ...) come back in most documents
+        self.cache = LRUCache(cache_size) if cache_size else None
 
-                # change DBpedia URI to Wikidata URI
-                if ann['URI'] in self.mappings:
-                    ann['URI'] = self.mappings[ann['URI']]
-                else:
-                    continue
+        self.candidates = 0
+        self.rejected = 0
+        self.matched = 0
 
-                entity = Entity(ann['URI'],
-                                boundaries=(e_start, e_end),
-                                surfaceform=ann['surfaceForm'],
-                                annotator=self.annotator_name)
+    def labels(self, uri):
+        """
+        :return: tuple of (lowercased label, its words) for each label of uri
+        """
+        if self.cache is not None:
+            labels = self.cache.get(uri)
+            if labels is not None:
+                return labels
+        labels = tuple((x, tuple(self.words.findall(x))) for x in (l.lower() for l in self.label_read.get(uri)))
+        if self.cache is not None:
+            self.cache.put(uri, labels)
+        return labels
+
+    def stats(self):
+        """
+        :return: number of candidate labels, of labels rejected by the token prefilter and of labels
+        found in the text, the hit / miss counts of the label cache and the approximate memory of its content in bytes
+        """
+        stats = {"candidates": self.candidates, "rejected": self.rejected, "matched": self.matched}
+        if self.cache is not None:
+            stats.update(self.cache.stats())
+            stats["bytes"] = sum(sys.getsizeof(uri) + sys.getsizeof(labels) +
+                                 sum(sys.getsizeof(x) + sys.getsizeof(w) + sum(sys.getsizeof(t) for t in w)
+                                     for x, w in labels)
+                                 for uri, labels in self.cache.items())
+        return stats
 
-                document.entities.append(entity)
+    def run(self, document):
+        text = document.text.lower()
+        # a label surrounded by delimiters can only be found if each of its words is a token of the text
+        tokens = set([text[start:end] for (start, end) in document.words_boundaries])
 
-        return document
-'''
+        # (URI, lowercased label) of the neighbours of the document
+        candidates = []
+        for uri in self.trip_read_items.get(document.docid):
+            for x, words in self.labels(uri):
+                self.candidates += 1
+                if all([w in tokens for w in words]):
+                    candidates.append((uri, x))
+                else:
+                    self.rejected += 1
 
-class WikidataPropertyLinker(BasePipeline):
+        # look for all the remaining labels in the text in one pass
+        matches = delimited_matches(text, [x for uri, x in candidates])
 
-    def __init__(self, wd_prop_mapping):
-        self.annotator_name = 'Wikidata_Property_Linker'
+        for uri, x in candidates:
+            if matches[x]:
+                self.matched += 1
 
-        self.mappings = {}
-        with open(wd_prop_mapping) as f:
-            for l in csv.reader(f, delimiter='\t'):
-                self.mappings[l[2]] = l[0]
+            for (start, end) in matches[x]:
 
-    def run(self, document):
-        dict_keys = self.mappings.keys()
-        stop_words = ["i", "me", "my", "myself", "we", "our", "ours", "ourselves", "you", "your", "yours", "yourself",
-                      "yourselves", "he", "him", "his", "himself", "she", "her", "hers", "herself", "it", "its",
-                      "itself", "they", "them", "their", "theirs", "themselves", "what", "which", "who", "whom", "this",
-                      "that", "these", "those", "am", "is", "are", "was", "were", "be", "been", "being", "have", "has",
-                      "had", "having", "do", "does", "did", "doing", "a", "an", "the", "and", "but", "if", "or",
-                      "because", "as", "until", "while", "of", "at", "by", "for", "with", "about", "against", "between",
-                      "into", "through", "during", "before", "after", "above", "below", "to", "from", "up", "down",
-                      "in", "out", "on", "off", "over", "under", "again", "further", "then", "once", "here", "there",
-                      "when", "where", "why", "how", "all", "any", "both", "each", "few", "more", "most", "other",
-                      "some", "such", "no", "nor", "not", "only", "own", "same", "so", "than", "too", "very", "s", "t",
-                      "can", "will", "just", "don", "should", "now"]
-
-        for prop in dict_keys:
-            for m in re.finditer(r"\b" + re.escape(prop) + r"\b", document.text):
-                (start, end) = m.start(), m.end()
-                if document.text[start:end] not in stop_words:
-                    entity = Entity(self.mappings[document.text[start:end]],
-                                    boundaries=(start, end),
-                                    surfaceform=document.text[start:end],
-                                    annotator=self.annotator_name)
+                if start == end:
+                    sform = document.text[start]
+                else:
+                    sform = document.text[start:end]
 
-                    document.entities.append(entity)
+                # create entitity if match is found
+                entity = Entity(uri,
+                                boundaries=(start, end),
+                                surfaceform=sform,
+                                annotator=self.annotator_name)
+                # add entity to document
+                document.entities.append(entity)
 
         return document
 
-class KeywordMatchingEntityLinker(BasePipeline):
+class SurfaceFormEntityLinker(BasePipeline):
+    """
+    links the token n-grams of the text that are labels in a global surface form dictionary
+    (utils.surfaceforms.SurfaceFormIndex), keeping the entities of the KB neighbourhood of the document
+    the cost depends on the length of the text, not on the number of neighbours of the document
+    """
 
-    def __init__(self, trip_read_items, label_read):
-        self.annotator_name = 'Keyword_Matching_Entity_Linker'
+    def __init__(self, trip_read_items, surface_forms, baseuri="http://www.wikidata.org/entity/"):
+        """
+        :param trip_read_items: TripleReaderItems giving the neighbourhood of the document
+        :param surface_forms: SurfaceFormIndex
+        """
+        self.annotator_name = 'Surface_Form_Entity_Linker'
         self.trip_read_items = trip_read_items
-        self.label_read = label_read
+        self.surface_forms = surface_forms
+        self.baseuri = baseuri
 
     def run(self, document):
-        # iterate over URIs
-        for uri in self.trip_read_items.get(document.docid):
-            # get array of labels for URI
-            labels = self.label_read.get(uri)
-            for x in labels:
-                # look for label in the text
-                delims = re.escape(u"\".؟()[]?,' ")
-                for m in re.finditer(r"(^|[%s])(%s)([%s]|$)"%(delims, re.escape(x.lower()), delims), document.text.lower()):
-
-                    (start, end) = m.span(2)
-
-                    if start == end:
-                        sform = document.text[start]
-                    else:
-                        sform = document.text[start:end]
+        neighbours = self.trip_read_items.get(document.docid)
 
-                    # create entitity if match is found
+        for (start, end, ids) in self.surface_forms.find(document.text, document.words_boundaries):
+            for i in ids.tolist():
+                uri = "%sQ%s" % (self.baseuri, i)
+                if uri in neighbours:
                     entity = Entity(uri,
                                     boundaries=(start, end),
-                                    surfaceform=sform,
+                                    surfaceform=document.text[start:end],
                                     annotator=self.annotator_name)
-                    # add entity to document
                     document.entities.append(entity)
 
         return document
 
 class DateLinker(BasePipeline):
 
-    def __init__(self, resource_folder=None):
+    # joins the documents of a SUTime batch, no date can be read across it
+    BATCH_SEPARATOR = u"\n\n* * *\n\n"
+
+    def __init__(self, resource_folder=None, mode="sutime", workers=0, queue_size=2):
+        """
+        :param resource_folder: folder of the SUTime jars
+        :param mode: "sutime" parses every document with SUTime. "fast" finds the common dates with
+        utils.dates rules and parses a document with SUTime only if the rules are unsure about one
+        of its sentences, whose dates are then taken from SUTime. "rules" never starts SUTime and
+        skips these sentences
+        :param workers: number of SUTime worker processes (each with its own JVM) used by imap,
+        0 to parse in this process
+        :param queue_size: number of batches given to a worker at once
+        """
         self.annotator_name = 'Date_Linker'
         if resource_folder is None:
-            self.resource_folder = os.path.join(os.path.dirname(__file__), '../resources/sutime/')
-        self.sutime = SUTime(jars=self.resource_folder)
-
-    def run(self, document):
+            resource_folder = os.path.join(os.path.dirname(__file__), '../resources/sutime/')
+        self.resource_folder = resource_folder
+        self.mode = mode
+        self.sutime = None
+        self.pool = None
+        if mode != "rules":
+            if workers:
+                self.pool = ParserPool(functools.partial(SUTime, jars=self.resource_folder), workers, queue_size)
+            else:
+                self.sutime = SUTime(jars=self.resource_folder)
+
+        # sentences handled by the rules and by SUTime, documents parsed by SUTime and SUTime calls
+        self.counts = {"rules": 0, "sutime": 0, "documents": 0, "sutime_documents": 0, "sutime_calls": 0}
+
+    def split(self, texts, dates):
+        """
+        give the dates SUTime found in the texts joined with BATCH_SEPARATOR back to their text,
+        with offsets relative to it as if the text was parsed alone
+        :return: list of the dates of each text, ordered by start
+        """
+        # SUTime offsets count java (utf-16) chars, a character outside the BMP is one python char
+        # on wide builds but two java ones, so the texts are placed in utf-16 units
+        lengths = [len(text.encode('utf-16-le')) // 2 for text in texts]
+        separator = len(self.BATCH_SEPARATOR)
+        starts = []
+        length = 0
+        for text_length in lengths:
+            starts.append(length)
+            length += text_length + separator
+
+        res = [[] for text in texts]
+        for date in dates:
+            i = bisect.bisect_right(starts, date["start"]) - 1
+            start, end = date["start"] - starts[i], date["end"] - starts[i]
+            # a date reaching into the separator is not a date of the text
+            if end <= lengths[i]:
+                res[i].append(dict(date, start=start, end=end))
+        return res
+
+    def sutime_parse(self, texts):
+        """
+        parse many texts with one SUTime call
+        :return: list of the dates of each text, ordered by start
+        """
+        self.counts["sutime_calls"] += 1
+        joined = self.BATCH_SEPARATOR.join(texts)
+        return self.split(texts, self.pool.parse(joined) if self.pool is not None else self.sutime.parse(joined))
 
-        dates = self.sutime.parse(document.text)
+    def rules(self, documents):
+        """
+        :return: (the dates the rules found in each document, list of (index of a document,
+        its sentences to take from SUTime or None for all of them))
+        """
+        self.counts["documents"] += len(documents)
+        if self.mode == "sutime":
+            return [[] for d in documents], [(i, None) for i in range(len(documents))]
+
+        res = []
+        unsure = []
+        for i, document in enumerate(documents):
+            sentences = document.sentences_boundaries or [(0, len(document.text))]
+            dates = []
+            sentences_unsure = []
+            for (start, end) in sentences:
+                found = recognize_dates(document.text, start, end)
+                if found is None:
+                    sentences_unsure.append((start, end))
+                else:
+                    dates.extend(found)
+            self.counts["rules"] += len(sentences) - len(sentences_unsure)
+            self.counts["sutime"] += len(sentences_unsure)
+            res.append(dates)
+            if sentences_unsure and self.mode != "rules":
+                unsure.append((i, sentences_unsure))
+        return res, unsure
+
+    def merge(self, res, unsure, all_dates):
+        """
+        add the SUTime dates of the sentences the rules are unsure about to the ones of the rules
+        :param all_dates: SUTime dates of each document of unsure
+        """
+        self.counts["sutime_documents"] += len(unsure)
+        for (i, sentences), dates in zip(unsure, all_dates):
+            if sentences is None:
+                res[i] = dates
+            else:
+                res[i].extend([date for date in dates
+                               if any([start <= date["start"] < end for (start, end) in sentences])])
+                res[i].sort(key=lambda date: date["start"])
+        return res
+
+    def parse_batch(self, documents):
+        """
+        :return: list of the dates of each document as SUTime gives them, ordered by start
+        """
+        res, unsure = self.rules(documents)
+        if unsure:
+            self.merge(res, unsure, self.sutime_parse([documents[i].text for i, sentences in unsure]))
+        return res
 
-        pattern = re.compile(r"^-*\d*-*\d*-*\d*-*$")
+    def parse(self, document):
+        """
+        :return: the dates of the document as SUTime gives them, ordered by start
+        """
+        return self.parse_batch([document])[0]
 
+    def link(self, document, dates):
         for date in dates:
-            if date["type"] == "DATE" and pattern.match(date["value"]):
-                val = date["value"]
-                if val[0] == '-':
-                    if len(val[1:]) == 4:
-                        stdform = val + '-00-00T00:00:00Z^^http://www.w3.org/2001/XMLSchema#dateTime'
-                    elif len(val[1:]) == 7:
-                        stdform = val + '-00T00:00:00Z^^http://www.w3.org/2001/XMLSchema#dateTime'
-                    elif len(val[1:]) == 10:
-                        stdform = val + 'T00:00:00Z^^http://www.w3.org/2001/XMLSchema#dateTime'
-                    else:
-                        stdform = val + '^^<http://www.w3.org/2001/XMLSchema#dateTime>'
-
-                else:
-                    if len(val) == 4:
-                        stdform = val + '-00-00T00:00:00Z^^http://www.w3.org/2001/XMLSchema#dateTime'
-                    elif len(val) == 7:
-                        stdform = val + '-00T00:00:00Z^^http://www.w3.org/2001/XMLSchema#dateTime'
-                    elif len(val) == 10:
-                        stdform = val + 'T00:00:00Z^^http://www.w3.org/2001/XMLSchema#dateTime'
-                    else:
-                        stdform = val + '^^<http://www.w3.org/2001/XMLSchema#dateTime>'
+            if date["type"] == "DATE" and DATE_VALUE.match(date["value"]):
+                stdform = date_uri(date["value"])
 
                 start = date["start"]
                 end = date["end"]
@@ -311,3 +495,61 @@ class DateLinker(BasePipeline):
                 document.entities.append(entity)
 
         return document
+
+    def run(self, document):
+        return self.link(document, self.parse(document))
+
+    def run_batch(self, documents, batch_size=200):
+        """
+        link the dates of many documents with one SUTime call per batch_size documents
+        :return: list of the documents
+        """
+        for i in range(0, len(documents), batch_size):
+            batch = documents[i:i + batch_size]
+            for document, dates in zip(batch, self.parse_batch(batch)):
+                self.link(document, dates)
+        return documents
+
+    def imap(self, documents, batch_size=50):
+        """
+        link the dates of a stream of documents batch by batch, with the worker pool the
+        batches are parsed in parallel
+        :param documents: iterable of documents
+        :return: iterator over the linked documents, in order
+        """
+        documents = iter(documents)
+        batches = iter(lambda: list(itertools.islice(documents, batch_size)), [])
+        if self.pool is None:
+            for batch in batches:
+                for document in self.run_batch(batch, batch_size):
+                    yield document
+            return
+
+        # batches sent to the pool, with what the rules found in them
+        pending = deque()
+
+        def texts():
+            for batch in batches:
+                res, unsure = self.rules(batch)
+                batch_texts = [batch[i].text for i, sentences in unsure]
+                pending.append((batch, res, unsure, batch_texts))
+                # a batch the rules are sure about is not sent to SUTime
+                if not unsure:
+                    yield None
+                    continue
+                self.counts["sutime_calls"] += 1
+                yield self.BATCH_SEPARATOR.join(batch_texts)
+
+        for dates in self.pool.imap(texts()):
+            batch, res, unsure, texts = pending.popleft()
+            if dates is not None:
+                self.merge(res, unsure, self.split(texts, dates))
+            for document, dates in zip(batch, res):
+                yield self.link(document, dates)
+
+    def close(self):
+        """
+        stop the SUTime worker processes
+        """
+        if self.pool is not None:
+            self.pool.close()
@@ -39,13 +39,12 @@ class NoSubjectAlign(BasePipeline):
                                  surfaceform=document.title,
                                  annotator=self.annotator_name)
 
-            for o in es:
-                if subject.uri == o.uri:
-                    continue
+            objects = [o for o in es if subject.uri != o.uri]
 
-                predicates = self.wikidata_triples.get(subject.uri, o.uri)
-                #predicates = self.wikidata_triples["%s\t%s" % (subject.uri, o.uri)]
+            # all the pairs of the sentence are looked up in one batch
+            all_predicates = self.wikidata_triples.get_many([(subject.uri, o.uri) for o in objects])
 
+            for o, predicates in zip(objects, all_predicates):
                 for pred in predicates:
                     pred = Entity(pred,
                                   boundaries=None,
@@ -91,14 +90,12 @@ class SimpleAligner(BasePipeline):
             es = [j for j in document.entities if j.boundaries[0] >= start and j.boundaries[1] <= end]
 
             # We use permutations to match every entity with all the others
-            for o in itertools.permutations(es, 2):
-                if o[0].uri == o[1].uri:
-                    continue
+            pairs = [o for o in itertools.permutations(es, 2) if o[0].uri != o[1].uri]
 
-                # We grab the predicates
-                #predicates = self.wikidata_triples["%s\t%s" % (o[0].uri, o[1].uri)]
-                predicates = self.wikidata_triples.get(o[0].uri, o[1].uri)
+            # We grab the predicates of all the pairs of the sentence in one batch
+            all_predicates = self.wikidata_triples.get_many([(o[0].uri, o[1].uri) for o in pairs])
 
+            for o, predicates in zip(pairs, all_predicates):
                 # And create the triples
                 for pred in predicates:
                     pred = Entity(pred,
@@ -120,12 +117,18 @@ class SimpleAligner(BasePipeline):
 
 class SPOAligner(BasePipeline):
 
-    def __init__(self, triples_reference):
+    def __init__(self, triples_reference, property_linker=None):
+        """
+        :param triples_reference: triple reader giving the predicates between two entities
+        :param property_linker: WikidataPropertyLinker, to link the properties lazily: only in the sentences
+        with entity pairs and only the predicates of these pairs. Leave None if it already ran on the document
+        """
         self.annotator_name = "SPOAligner"
         # Add here the name of the annotators creating entities with something else than properties
         self.annotator_list = ["Wikidata_Spotlight_Entity_Linker", "Simple_Coreference", "Date_Linker"]
 
         self.wikidata_triples = triples_reference
+        self.property_linker = property_linker
 
     def run(self, document):
         for sid, (start, end) in enumerate(document.sentences_boundaries):
@@ -135,18 +138,19 @@ class SPOAligner(BasePipeline):
                                                 and j.boundaries[1] <= end
                                                 and j.annotator in self.annotator_list]
 
-            # Entities created by the Property Linker
-            p = [j for j in document.entities if j.boundaries[0] >= start
-                                                and j.boundaries[1] <= end
-                                                and j.annotator == 'Wikidata_Property_Linker']
-
-            for o in itertools.permutations(es, 2):
-                if o[0].uri == o[1].uri:
-                    continue
+            pairs = [o for o in itertools.permutations(es, 2) if o[0].uri != o[1].uri]
+            all_predicates = self.wikidata_triples.get_many([(o[0].uri, o[1].uri) for o in pairs])
 
-                predicates = self.wikidata_triples.get(o[0].uri, o[1].uri)
-                #predicates = self.wikidata_triples["%s\t%s" % (o[0].uri, o[1].uri)]
+            # Entities created by the Property Linker
+            if self.property_linker is not None:
+                kbpreds = set([kbpred for predicates in all_predicates for kbpred in predicates])
+                p = self.property_linker.link(document, start, end, kbpreds) if kbpreds else []
+            else:
+                p = [j for j in document.entities if j.boundaries[0] >= start
+                                                    and j.boundaries[1] <= end
+                                                    and j.annotator == 'Wikidata_Property_Linker']
 
+            for o, predicates in zip(pairs, all_predicates):
                 # And create the triples
                 for kbpred in predicates:
                     for spred in p:
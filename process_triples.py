@@ -1,41 +1,219 @@
 ######################################################################################################
-# script to convert a Wikidata dump to csv file and change it according to a given properties files #
+# script to convert a Wikidata truthy dump to the csv files of the pipeline in a single pass        #
+# writes the triples csv (optionally only some properties), the labels csv, the DBpedia-Wikidata    #
+# sameas mapping and optionally the compiled binary index of the triples (see compile_kb.py)       #
+# the dump is decompressed in parallel with lbzip2 / pbzip2 when installed and parsed by a pool of  #
+# processes in chunks of lines                                                                      #
 ######################################################################################################
 
 import argparse
 import bz2
+import collections
+import multiprocessing
+import subprocess
+import time
+import urllib
+from distutils.spawn import find_executable
+from utils.properties import read_properties
 
 parser = argparse.ArgumentParser(description='script to convert a Wikidata dump to csv file'
                                              'and change it according to a given properties files')
-parser.add_argument('-i', '--input', help='Wikidata dump', required=True)
-parser.add_argument('-p', '--properties', help='properties file', required=True)
-parser.add_argument('-o', '--out', help='output file name', required=True)
+parser.add_argument('-i', '--input', help='Wikidata truthy dump (.nt.bz2 or .nt)', required=True)
+parser.add_argument('-p', '--properties', help='properties file, only the triples of these properties are kept')
+parser.add_argument('-k', '--top', type=int, help='only keep the k most used properties of the properties file')
+parser.add_argument('-o', '--out', help='output triples csv file', required=True)
+parser.add_argument('-l', '--labels', help='output labels csv file')
+parser.add_argument('-s', '--sameas', help='output DBpedia to Wikidata sameas mapping csv file')
+parser.add_argument('--wiki', default='en', help='language of the Wikipedia / DBpedia of the sameas mapping')
+parser.add_argument('--index', help='output folder of the compiled binary index of the triples')
+parser.add_argument('-w', '--workers', type=int, default=multiprocessing.cpu_count(), help='number of processes')
+parser.add_argument('--chunk', type=int, default=4, help='size in MB of the chunks of lines given to each process')
 args = parser.parse_args()
 
-# reading properties
-properties = []
-with open(args.properties) as f:
-    for l in f.readlines():
-        properties.append(l.strip())
+PRED = "http://www.wikidata.org/prop/direct/P"
+LABELS = set(["http://schema.org/name", "http://www.w3.org/2004/02/skos/core#altLabel"])
+ABOUT = "http://schema.org/about"
+# the sitelinks are percent-encoded urls, DBpedia uses IRIs where only these characters stay encoded
+DBPEDIA_ESCAPED = set('"#%<>?[\\]^`{|}')
 
-properties = set(properties)
 
-out = open(args.out, "w")
-counter = 0
-with bz2.BZ2File(args.input) as f:
-    for l in f:
-        if "/prop/direct/P" not in l:
+def dump_blocks(path, workers, size=1 << 20):
+    """
+    yields the decompressed content of the dump in blocks
+    uses lbzip2 or pbzip2 to decompress the bz2 blocks on several cores, otherwise reads
+    the (possibly multi stream) bz2 file in this process
+    """
+    if not path.endswith(".bz2"):
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(size), ""):
+                yield block
+        return
+
+    cmd = None
+    if find_executable("lbzip2"):
+        cmd = ["lbzip2", "-d", "-c", "-n", str(workers), path]
+    elif find_executable("pbzip2"):
+        cmd = ["pbzip2", "-d", "-c", "-p%s" % workers, path]
+
+    if cmd is not None:
+        p = subprocess.Popen(cmd, stdout=subprocess.PIPE, bufsize=size)
+        for block in iter(lambda: p.stdout.read(size), ""):
+            yield block
+        if p.wait() != 0:
+            raise IOError("%s failed with exit code %s" % (cmd[0], p.returncode))
+        return
+
+    print("lbzip2 / pbzip2 not found, decompressing in a single process")
+    d = bz2.BZ2Decompressor()
+    with open(path, "rb") as f:
+        for data in iter(lambda: f.read(size), ""):
+            while data:
+                try:
+                    yield d.decompress(data)
+                except EOFError:
+                    # the previous stream ended exactly at the end of the last read
+                    d = bz2.BZ2Decompressor()
+                    continue
+                # rest of the data after the end of a stream
+                data = d.unused_data
+                if data:
+                    d = bz2.BZ2Decompressor()
+
+
+def line_chunks(blocks, size):
+    """
+    regroups blocks of text into chunks of about size bytes that end with a full line
+    """
+    buf = []
+    buf_len = 0
+    for block in blocks:
+        buf.append(block)
+        buf_len += len(block)
+        if buf_len >= size:
+            text = "".join(buf)
+            end = text.rfind("\n") + 1
+            if end > 0:
+                yield text[:end]
+                buf = [text[end:]]
+                buf_len = len(buf[0])
+    text = "".join(buf)
+    if text:
+        yield text
+
+
+def init_worker(properties, wiki):
+    global PROPERTIES, WIKI, DBPEDIA
+    PROPERTIES = properties
+    WIKI = "https://%s.wikipedia.org/wiki/" % wiki
+    DBPEDIA = "http://dbpedia.org/resource/" if wiki == "en" else "http://%s.dbpedia.org/resource/" % wiki
+
+
+def dbpedia_title(title):
+    """
+    :param title: percent-encoded title of a Wikipedia sitelink e.g. %C3%89mile_Zola
+    :return: utf-8 title of the DBpedia IRI of the page, "%" and a few other characters stay encoded
+    """
+    if "%" not in title:
+        return title
+    return "".join(["%%%02X" % ord(c) if c in DBPEDIA_ESCAPED else c for c in urllib.unquote(title)])
+
+
+def parse_object(o):
+    """
+    :param o: object of a N-Triples line
+    :return: (value, language) uris and blank nodes are kept as is, literals lose their quotes,
+    typed literals are written value^^type, the language is only set for literals with a language tag
+    """
+    if o.startswith("<"):
+        return o[1:-1], None
+    if not o.startswith('"'):
+        return o, None
+    end = o.rfind('"')
+    value = o[1:end]
+    rest = o[end + 1:]
+    if rest.startswith("@"):
+        return value, rest[1:]
+    if rest.startswith("^^<"):
+        return "%s^^%s" % (value, rest[3:-1]), None
+    return value, None
+
+
+def parse_chunk(chunk):
+    """
+    :param chunk: lines of the dump
+    :return: (number of lines, triples csv, labels csv, sameas csv) of the chunk
+    """
+    triples = []
+    labels = []
+    sameas = []
+    for l in chunk.split("\n"):
+        # <subject> <predicate> object .
+        if not l.startswith("<"):
+            continue
+        i = l.find("> <")
+        j = l.find("> ", i + 3)
+        if i < 0 or j < 0:
             continue
-        tmp = l.split(' ')
-        p = tmp[1][1:-1]
-        if p in properties:
-            s = tmp[0][1:-1]
-            o = ' '.join(tmp[2:])[0:-2]
-            if 'XMLSchema' not in o and 'Point' not in o:
-                o = o[1:-2]
-            out.write(s + '\t' + p + '\t' + o + '\n')
-
-        if counter % 10000 == 0:
-            print("%s logged triples" % counter)
-
-        counter += 1
+        s = l[1:i]
+        p = l[i + 3:j]
+
+        if p.startswith(PRED):
+            if PROPERTIES is None or p in PROPERTIES:
+                o, lang = parse_object(l[j + 2:].rstrip(" .\r"))
+                triples.append("%s\t%s\t%s\n" % (s, p, o))
+        elif p in LABELS:
+            o, lang = parse_object(l[j + 2:].rstrip(" .\r"))
+            if lang is not None:
+                labels.append("%s\t%s\t%s .\n" % (s, o, lang))
+        elif p == ABOUT and s.startswith(WIKI):
+            o, lang = parse_object(l[j + 2:].rstrip(" .\r"))
+            sameas.append("%s%s\t%s\n" % (DBPEDIA, dbpedia_title(s[len(WIKI):]), o))
+
+    return chunk.count("\n"), "".join(triples), "".join(labels), "".join(sameas)
+
+
+properties = read_properties(args.properties, args.top) if args.properties else None
+
+outs = [open(args.out, "w"),
+        open(args.labels, "w") if args.labels else None,
+        open(args.sameas, "w") if args.sameas else None]
+
+start = time.time()
+n_lines = 0
+n_triples = 0
+pool = multiprocessing.Pool(args.workers, init_worker, (properties, args.wiki))
+# keep a bounded number of chunks in flight, results are written in dump order
+pending = collections.deque()
+
+
+def write(result):
+    global n_lines, n_triples
+    lines, triples, labels, sameas = result.get()
+    for out, text in zip(outs, (triples, labels, sameas)):
+        if out is not None:
+            out.write(text)
+    n_lines += lines
+    n_triples += triples.count("\n")
+    print("%s lines read, %s triples written, %.0f lines/s" % (n_lines, n_triples, n_lines / (time.time() - start)))
+
+
+for chunk in line_chunks(dump_blocks(args.input, args.workers), args.chunk << 20):
+    pending.append(pool.apply_async(parse_chunk, (chunk,)))
+    if len(pending) >= 2 * args.workers:
+        write(pending.popleft())
+
+while pending:
+    write(pending.popleft())
+
+pool.close()
+pool.join()
+for out in outs:
+    if out is not None:
+        out.close()
+
+print("converted %s lines in %.1fs" % (n_lines, time.time() - start))
+
+if args.index:
+    from utils.kbindex import compile_kb
+    compile_kb(args.out, args.index)
+    print("index written to %s in %.1fs" % (args.index, time.time() - start))
@@ -1,3 +1,4 @@
+import itertools
 from pipeline.pipeline import *
 from pipeline.entitylinker import *
 from pipeline.triplealigner import *
@@ -5,41 +6,66 @@ from pipeline.datareader import DBpediaAbstractsDataReader
 from pipeline.writer import JsonWriter
 from pipeline.coreference import *
 from utils.triplereader import *
+from utils.spotlight import SpotlightError
 
 
 start_doc = 0   #start reading from document number #
+__LAZY_PROPERTIES__ = False   # True: properties linked by SPOAligner only in the sentences with entity pairs,
+                              # faster but the other sentences get no Wikidata_Property_Linker entities
+__BATCH__ = 100   # documents linked by Spotlight and whose entities are prefetched together
 
 # Reading the DBpedia Abstracts Dataset
 reader = DBpediaAbstractsDataReader('./datasets/wikipedia-abstracts/csv/dbpedia-abstracts.csv', db_wd_mapping='./datasets/wikidata/dbpedia-wikidata-sameas-dict.csv', skip=start_doc)
 
 # Loading the WikidataSpotlightEntityLinker ... DBpedia Spotlight with mapping DBpedia URIs to Wikidata
-link = WikidataSpotlightEntityLinker('./datasets/wikidata/dbpedia-wikidata-sameas-dict.csv', support=10, confidence=0.4)
+# the annotations are cached on disk, texts annotated by a previous run are not sent again
+link = WikidataSpotlightEntityLinker('./datasets/wikidata/dbpedia-wikidata-sameas-dict.csv', support=10, confidence=0.4,
+                                     cache_file='./datasets/spotlight-cache.sqlite')
 
 coref = SimpleCoreference()
 trip_read = TripleReader('./datasets/wikidata/wikidata-triples.csv')
 Salign = SimpleAligner(trip_read)
 prop = WikidataPropertyLinker('./datasets/wikidata/wikidata-properties.csv')
 date = DateLinker()
-SPOalign = SPOAligner(trip_read)
+SPOalign = SPOAligner(trip_read, prop if __LAZY_PROPERTIES__ else None)
 NSalign = NoSubjectAlign(trip_read)
 writer = JsonWriter('./out', "re-nlg", startfile=start_doc)
 
-for d in reader.read_documents():
+documents = reader.read_documents()
+for batch in iter(lambda: list(itertools.islice(documents, __BATCH__)), []):
 
+    # link the entities of the batch with concurrent Spotlight requests, one document at a time if the
+    # service keeps failing so that only the documents it fails on are lost
     try:
-        d = link.run(d)
+        batch = link.run_batch(batch)
+        linked = True
+    except SpotlightError:
+        linked = False
 
-        d = date.run(d)
-        d = NSalign.run(d)
+    # load the entities of the batch at once when the KB is disk backed (compile_kb.py --sqlite)
+    trip_read.prefetch(set([d.uri for d in batch] + [e.uri for d in batch for e in d.entities]))
 
-        d = coref.run(d)
-        d = Salign.run(d)
+    for d in batch:
 
-        d = prop.run(d)
-        d = SPOalign.run(d)
-        writer.run(d)
-        print "Document Title: %s \t Number of Annotated Entities %s \t Number of Annotated Triples %s" % (d.title, len(d.entities), len(d.triples))
+        try:
+            if not linked:
+                d = link.run(d)
 
-    except Exception as e:
+            d = date.run(d)
+            d = NSalign.run(d)
 
-        print "error Processing document %s" % d.title
+            d = coref.run(d)
+            d = Salign.run(d)
+
+            if not __LAZY_PROPERTIES__:
+                d = prop.run(d)
+            d = SPOalign.run(d)
+            writer.run(d)
+            print "Document Title: %s \t Number of Annotated Entities %s \t Number of Annotated Triples %s" % (d.title, len(d.entities), len(d.triples))
+
+        except Exception as e:
+
+            print "error Processing document %s" % d.title
+
+link.cache.flush()
+print "Spotlight cache: %(hits)s hits, %(misses)s misses, hit rate %(hit_rate).4f" % link.cache.stats()
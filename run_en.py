@@ -1,3 +1,5 @@
+import itertools
+import os
 from pipeline.pipeline import *
 from pipeline.entitylinker import *
 from pipeline.triplealigner import *
@@ -5,6 +7,7 @@ from pipeline.placeholdertagger import *
 from pipeline.datareader import DBpediaAbstractsDataReader
 from pipeline.writer import *
 # from pipeline.coreference import *
+from utils.kbstore import *
 from utils.triplereader import *
 from utils.triplereaderitems import *
 from utils.triplereadertriples import *
@@ -12,6 +15,7 @@ from utils.labelreader import *
 from pipeline.filter import *
 
 start_doc = 0   #start reading from document number #
+__BATCH__ = 100   # documents whose entities are prefetched together
 
 # Reading the DBpedia Abstracts Dataset
 reader = DBpediaAbstractsDataReader('./datasets/wikipedia-abstracts/csv/dbpedia-abstracts.csv', skip=start_doc)
@@ -20,10 +24,15 @@ reader = DBpediaAbstractsDataReader('./datasets/wikipedia-abstracts/csv/dbpedia-
 # link = WikidataSpotlightEntityLinker('./datasets/wikidata/dbpedia-wikidata-sameas-dict.csv', support=10, confidence=0.4)
 
 #coref = SimpleCoreference()
-trip_read = TripleReader('./datasets/wikidata/wikidata-triples.csv')
-label_read = LabelReader('./datasets/wikidata/wikidata-labels.csv', 'en')
-trip_read_items = TripleReaderItems('./datasets/wikidata/wikidata-triples.csv')
-trip_read_trip = TripleReaderTriples('./datasets/wikidata/wikidata-triples.csv')
+# compiled triple index (compile_kb.py) if there is one, it is memory mapped instead of parsing the csv file
+__KB__ = './datasets/wikidata/wikidata-triples.idx' if os.path.isdir('./datasets/wikidata/wikidata-triples.idx') else './datasets/wikidata/wikidata-triples.csv'
+kb = open_kb(__KB__)
+trip_read = TripleReader(kb)
+# compiled label index (compile_labels.py) if there is one, else the csv file
+__LABELS__ = './datasets/wikidata/wikidata-labels.idx' if os.path.isdir('./datasets/wikidata/wikidata-labels.idx') else './datasets/wikidata/wikidata-labels.csv'
+label_read = LabelReader(__LABELS__, 'en')
+trip_read_items = TripleReaderItems(kb)
+trip_read_trip = TripleReaderTriples(kb)
 
 keyword_ent_linker = KeywordMatchingEntityLinker(trip_read_items, label_read)
 Salign = SimpleAligner(trip_read)
@@ -44,38 +53,48 @@ writer_triples = CustomeWriterTriples('./out_en', "re-nlg", startfile=start_doc)
 writer_entities = CustomeWriterEntities('./out_en', "re-nlg", startfile=start_doc)
 writer = JsonWriter('./out_en', "re-nlg", startfile=start_doc)
 
-for d in reader.read_documents():
+documents = reader.read_documents()
+for batch in iter(lambda: list(itertools.islice(documents, __BATCH__)), []):
 
-    try:
-        print "Processing Document Title: %s ..." % d.title
+    # load the main entities of the batch at once when the KB is disk backed (compile_kb.py --sqlite)
+    trip_read.prefetch([d.uri for d in batch])
+    # and the labels of their neighbours, read by the keyword entity linker
+    label_read.prefetch(set([uri for d in batch for uri in trip_read_items.get(d.docid)]))
 
-        if not ent_filt.run(d):
-            continue
+    for d in batch:
 
-        d = keyword_ent_linker.run(d)
+        try:
+            print "Processing Document Title: %s ..." % d.title
 
-        d = date.run(d)
-        d = NSalign.run(d)
+            if not ent_filt.run(d):
+                continue
 
-        #d = coref.run(d)
-        d = Salign.run(d)
+            d = keyword_ent_linker.run(d)
 
-        #d = prop.run(d)
-        #d = SPOalign.run(d)
-        d = sen_lim.run(d, 0)
+            d = date.run(d)
+            d = NSalign.run(d)
 
-        if not main_ent_lim.run(d):
-            continue
+            #d = coref.run(d)
+            d = Salign.run(d)
 
-        d = Noalign.run(d)
+            #d = prop.run(d)
+            #d = SPOalign.run(d)
+            d = sen_lim.run(d, 0)
 
-        d = prop_tag.run(d)
+            if not main_ent_lim.run(d):
+                continue
 
-        writer_triples.run(d)
-        writer_entities.run(d)
-        writer.run(d)
-        print "Number of Annotated Entities %s \t Number of Annotated Triples %s \n -------" % (len(d.entities), len(d.triples))
+            d = Noalign.run(d)
 
-    except Exception as e:
+            d = prop_tag.run(d)
 
-        print "error Processing document %s" % d.title
+            writer_triples.run(d)
+            writer_entities.run(d)
+            writer.run(d)
+            print "Number of Annotated Entities %s \t Number of Annotated Triples %s \n -------" % (len(d.entities), len(d.triples))
+
+        except Exception as e:
+
+            print "error Processing document %s" % d.title
+
+print "Keyword matching: %(candidates)s candidate labels, %(rejected)s rejected by the token prefilter, %(matched)s matched" % keyword_ent_linker.stats()
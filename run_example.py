@@ -5,6 +5,7 @@ from pipeline.datareader import DBpediaAbstractsDataReader
 from pipeline.writer import *
 from pipeline.coreference import *
 from pipeline.placeholdertagger import *
+from utils.kbstore import *
 from utils.triplereader import *
 from utils.triplereaderitems import *
 from utils.triplereadertriples import *
@@ -14,10 +15,11 @@ from pipeline.filter import *
 # Reading the DBpedia Abstracts Dataset
 reader = DBpediaAbstractsDataReader('./datasets/wikipedia-abstracts/csv/sample-dbpedia-abstracts-es.csv')
 
-trip_read = TripleReader('./datasets/wikidata/sample-wikidata-triples.csv')
+kb = KBStore('./datasets/wikidata/sample-wikidata-triples.csv')
+trip_read = TripleReader(kb)
 label_read = LabelReader('./datasets/wikidata/sample-wikidata-labels.csv', 'es')
-trip_read_items = TripleReaderItems('./datasets/wikidata/sample-wikidata-triples.csv')
-trip_read_trip = TripleReaderTriples('./datasets/wikidata/sample-wikidata-triples.csv')
+trip_read_items = TripleReaderItems(kb)
+trip_read_trip = TripleReaderTriples(kb)
 
 keyword_ent_linker = KeywordMatchingEntityLinker(trip_read_items, label_read)
 salign = SimpleAligner(trip_read)
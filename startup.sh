@@ -44,18 +44,12 @@ cd wikidata
 # triples
 echo "download wikidata facts triples statements from wikidata truthy dump .."
 wget https://dumps.wikimedia.org/wikidatawiki/entities/20170418/wikidata-20170418-truthy-BETA.nt.bz2
-echo "make csv file out of nt .."
-## skipping labels and meta information and keep only wikidata props
-bzcat  wikidata-20170418-truthy-BETA.nt.bz2 | grep "/prop/direct/P" | sed -E 's/[<>"]//g'| sed -E 's/@.+//g' | cut -d" " -f1-3 | sed -E 's/\s/\t/g' > wikidata-triples.csv
-echo "make csv file for labels out of nt .."
-## get only labels and aliases
-bzcat wikidata-20170418-truthy-BETA.nt.bz2 | grep -E "schema.org/name|skos/core#altLabel" | awk '{$2="";print $0}' | sed 's/\(.*\)\@/\1\t/' | sed 's/  /\t/g' | perl -pe 's/(?<!\\)"//g' | awk '{gsub(/\<|\>/,"",$1)}1' > wikidata-labels.csv
-
-# DBpedia -Wikidata Sameas
-echo "download DBpedia-Wikidata Same As links dump: wikidatawiki-20150330-sameas-all-wikis.ttl.bz2"
-wget http://wikidata.dbpedia.org/downloads/20150330/wikidatawiki-20150330-sameas-all-wikis.ttl.bz2
-echo "creating a csv dictionary out of english dbpedia uris to wikidata same as links"
-bzcat wikidatawiki-20150330-sameas-all-wikis.ttl.bz2 | grep "http://dbpedia.org" | awk '{ print $3 " " $1}'  | sed -e 's/wikidata\.dbpedia\.org\/resource/www.wikidata\.org\/entity/'  | sed -e 's/ /\t/' | sed -E 's/[<>\"]//g' > dbpedia-wikidata-sameas-dict.csv
+echo "make csv files of the triples, labels and DBpedia-Wikidata sameas links out of nt and compile the triples index .."
+## one parallel pass over the dump: wikidata props, labels and aliases, english wikipedia sitelinks
+cd ../..
+python process_triples.py -i ./datasets/wikidata/wikidata-20170418-truthy-BETA.nt.bz2 -o ./datasets/wikidata/wikidata-triples.csv -l ./datasets/wikidata/wikidata-labels.csv -s ./datasets/wikidata/dbpedia-wikidata-sameas-dict.csv --index ./datasets/wikidata/wikidata-triples.idx
+python compile_labels.py -i ./datasets/wikidata/wikidata-labels.csv -o ./datasets/wikidata/wikidata-labels.idx
+cd datasets/wikidata
 
 # Wikidata properties labels
 echo "download wikidata properties labels"
@@ -0,0 +1,58 @@
+######################################################################################
+# script to update a compiled KB index (see compile_kb.py) with a newer dump         #
+# the old and new triples (and labels) snapshots are diffed, only the added and      #
+# removed triples are applied to the index, and the uris of the documents whose     #
+# annotation can change are written out so that only they need to be reprocessed   #
+######################################################################################
+
+import argparse
+import time
+from utils.kbindex import KBIndex
+from utils.kbupdate import snapshot, tsv_labels, diff, filter_triples, apply_triples, affected_entities
+from utils.properties import read_properties
+
+parser = argparse.ArgumentParser(description='script to update a compiled KB index with a newer wikidata dump')
+parser.add_argument('-i', '--index', help='compiled KB index to update', required=True)
+parser.add_argument('-n', '--new', help='new wikidata triples csv file or compiled index', required=True)
+parser.add_argument('--old', help='old wikidata triples csv file or compiled index (default: the index itself)')
+parser.add_argument('--old-labels', help='old wikidata labels csv file')
+parser.add_argument('--new-labels', help='new wikidata labels csv file')
+parser.add_argument('-o', '--out', help='output folder of the updated index (default: update the index in place)')
+parser.add_argument('-a', '--affected', help='output file of the affected document uris, one per line', required=True)
+parser.add_argument('-d', '--dataset', help='only write the affected documents of this DBpedia abstracts dataset file')
+parser.add_argument('-m', '--mapping', help='DBpedia to Wikidata uri mapping file of the dataset')
+parser.add_argument('-p', '--properties', help='properties file the index was compiled with')
+parser.add_argument('-k', '--top', type=int, help='number of properties of the properties file the index was compiled with')
+args = parser.parse_args()
+
+start = time.time()
+
+added, removed = diff(snapshot(args.old or args.index), snapshot(args.new))
+print("%s triples added and %s removed in %.1fs" % (len(added), len(removed), time.time() - start))
+
+labels = []
+if args.old_labels and args.new_labels:
+    added_labels, removed_labels = diff(lambda: tsv_labels(args.old_labels), lambda: tsv_labels(args.new_labels))
+    labels = added_labels + removed_labels
+    print("%s labels added and %s removed in %.1fs" % (len(added_labels), len(removed_labels), time.time() - start))
+
+old_kb = KBIndex(args.index)
+properties = read_properties(args.properties, args.top) if args.properties else None
+# changes of the predicates left out of the index do not change any annotation
+added, removed = filter_triples(added, properties), filter_triples(removed, properties)
+if properties is not None:
+    print("%s triples added and %s removed with the properties of the index" % (len(added), len(removed)))
+new_kb = apply_triples(args.index, added, removed, args.out or args.index, properties)
+
+affected = affected_entities([old_kb, new_kb], added + removed, labels)
+
+if args.dataset:
+    from pipeline.datareader import DBpediaAbstractsDataReader
+    documents = set(DBpediaAbstractsDataReader(args.dataset, db_wd_mapping=args.mapping).read_uris())
+    affected &= documents
+
+with open(args.affected, "w") as f:
+    for uri in sorted(affected):
+        f.write("%s\n" % uri)
+
+print("%s affected documents written to %s in %.1fs" % (len(affected), args.affected, time.time() - start))
@@ -0,0 +1,83 @@
+import collections
+import numpy as np
+from utils.pairindex import pack_pairs
+
+
+class AdjacencyIndex:
+    """
+    undirected entity graph in CSR form: the neighbours of keys[i] are the sorted,
+    deduplicated ids neighbours[offsets[i]:offsets[i+1]]
+    """
+
+    def __init__(self, keys, offsets, neighbours):
+        self.keys = keys
+        self.offsets = offsets
+        self.neighbours = neighbours
+
+    @classmethod
+    def build(cls, subj, obj):
+        """
+        :param subj: subject id of each edge
+        :param obj: object id of each edge, only edges between two entities are given
+        """
+        subj = np.asarray(subj, dtype=np.int32)
+        obj = np.asarray(obj, dtype=np.int32)
+        # We want to have the entity whether it's object or subject
+        src = np.concatenate([subj, obj])
+        dst = np.concatenate([obj, subj])
+
+        edges = np.unique(pack_pairs(src, dst))
+        src = (edges >> 32).astype(np.int32)
+        dst = (edges & 0xFFFFFFFF).astype(np.uint32).view(np.int32)
+        # packed keys order negative ids after positive ones, sort them back as signed ints
+        order = np.lexsort((dst, src))
+        src = src[order]
+        dst = dst[order]
+
+        keys, starts = np.unique(src, return_index=True)
+        offsets = np.append(starts, len(src)).astype(np.uint32)
+        dst.flags.writeable = False
+        return cls(keys.astype(np.int32), offsets, dst)
+
+    def get(self, e):
+        """
+        :return: read only array of the sorted neighbour ids of entity id e
+        """
+        i = int(np.searchsorted(self.keys, e))
+        if i < len(self.keys) and self.keys[i] == e:
+            return self.neighbours[int(self.offsets[i]):int(self.offsets[i + 1])]
+        return self.neighbours[0:0]
+
+
+class NeighbourView(collections.Set):
+    """
+    read only set of entity uris backed by a sorted array of ids
+    ids are only turned into uris when iterated, through the to_uri function
+    """
+
+    def __init__(self, ids, to_uri, to_id):
+        self.ids = ids
+        self.to_uri = to_uri
+        self.to_id = to_id
+
+    @classmethod
+    def _from_iterable(cls, it):
+        # result of set operations (&, |, -) with other sets
+        return frozenset(it)
+
+    def __iter__(self):
+        for i in self.ids.tolist():
+            yield self.to_uri(i)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, uri):
+        i = self.to_id(uri)
+        if i is None:
+            return False
+        j = int(np.searchsorted(self.ids, i))
+        return j < len(self.ids) and self.ids[j] == i
+
+    def __repr__(self):
+        return "NeighbourView(%s)" % list(self)
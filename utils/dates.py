@@ -0,0 +1,122 @@
+import re
+
+# Rule based recognition of the dates SUTime finds most often in abstracts, for DateLinker.
+#
+# A sentence is handled by the rules only if every date cue in it (numbers that could be years,
+# month names, relative dates, eras, ...) is part of an expression the rules are sure about,
+# otherwise it is left to SUTime.
+
+XSD_DATETIME = "http://www.w3.org/2001/XMLSchema#dateTime"
+
+# values of the SUTime DATE expressions DateLinker links: years, months or days, BC ones start with '-'
+DATE_VALUE = re.compile(r"^-*\d*-*\d*-*\d*-*$")
+
+MONTHS = ["January", "February", "March", "April", "May", "June", "July",
+          "August", "September", "October", "November", "December"]
+MONTH_NUMBERS = dict((m, i + 1) for i, m in enumerate(MONTHS))
+DAYS_IN_MONTH = [31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+
+_MONTH = r"(?P<month>%s)" % "|".join(MONTHS)
+_YEAR = r"(?P<year>[12]\d{3})"
+
+# (name, regex, kind) of the expressions the rules are sure about, the span of an
+# expression is the one of its "date" group
+PATTERNS = [
+    # 12 March 1950
+    ("day month year", re.compile(r"\b(?P<date>(?P<day>\d{1,2}) %s %s)\b" % (_MONTH, _YEAR)), "day"),
+    # March 12, 1950
+    ("month day, year", re.compile(r"\b(?P<date>%s (?P<day>\d{1,2}), %s)\b" % (_MONTH, _YEAR)), "day"),
+    # March 1950
+    ("month year", re.compile(r"\b(?P<date>%s %s)\b" % (_MONTH, _YEAR)), "month"),
+    # 500 BC
+    ("year BC", re.compile(r"\b(?P<date>(?P<year>\d{1,4}) (?:BC|BCE))\b"), "bc"),
+    # in 1950, since 1950, born 1950
+    ("preposition year", re.compile(r"\b(?:[Ii]n|[Ss]ince|[Uu]ntil|[Ff]rom|[Dd]uring|[Aa]fter|[Bb]efore|"
+                                    r"[Bb]etween|[Bb]y|born|died) (?P<date>%s)\b" % _YEAR + u"(?![-\u2013/]\\d)"), "year"),
+    # (1950)
+    ("(year)", re.compile(r"\((?P<date>%s)\)" % _YEAR), "year"),
+]
+
+# anything that might be (part of) a date for SUTime
+CUES = re.compile(r"\b(?:\d{3,4}|\d+(?:s|st|nd|rd|th)|today|tonight|yesterday|tomorrow|years?|months?|weeks?|days?|"
+                  r"decades?|century|centuries|millenni(?:um|a)|ago|BC|BCE|AD|CE)\b", re.IGNORECASE)
+MONTH_CUES = re.compile(r"\b(?:%s|Jan|Feb|Mar|Apr|Jun|Jul|Aug|Sep|Sept|Oct|Nov|Dec)\b" % "|".join(MONTHS))
+# between two dates, SUTime merges them into one DURATION range e.g. "from 1950 until 1960", which
+# DateLinker does not link
+RANGE_SEPARATOR = re.compile(u"^\\s*(?:to|and|until|till|through|or|[-\u2013])\\s*$")
+
+
+def date_uri(value):
+    """
+    :param value: value of a SUTime DATE matching DATE_VALUE e.g. "1950", "1950-03-12" or "-0500"
+    :return: the xsd:dateTime literal DateLinker links it to
+    """
+    digits = value[1:] if value.startswith('-') else value
+    if len(digits) == 4:
+        return value + '-00-00T00:00:00Z^^' + XSD_DATETIME
+    elif len(digits) == 7:
+        return value + '-00T00:00:00Z^^' + XSD_DATETIME
+    elif len(digits) == 10:
+        return value + 'T00:00:00Z^^' + XSD_DATETIME
+    return value + '^^<' + XSD_DATETIME + '>'
+
+
+def date_value(m, kind):
+    """
+    :return: SUTime value of a match of one of the PATTERNS, None if it is not a valid date
+    """
+    if kind == "bc":
+        return "-%04d" % int(m.group("year"))
+    value = m.group("year")
+    if kind in ("month", "day"):
+        month = MONTH_NUMBERS[m.group("month")]
+        value += "-%02d" % month
+        if kind == "day":
+            day = int(m.group("day"))
+            if not 1 <= day <= DAYS_IN_MONTH[month - 1]:
+                return None
+            value += "-%02d" % day
+    return value
+
+
+def recognize_dates(text, start=0, end=None):
+    """
+    :param start: start of the sentence in text
+    :param end: end of the sentence, the end of the text by default
+    :return: list of the dates of text[start:end] as SUTime gives them
+    {"type": "DATE", "value": ..., "start": ..., "end": ..., "text": ..., "pattern": name of the rule}
+    ordered by start, or None if the rules are not sure about the sentence
+    """
+    if end is None:
+        end = len(text)
+    sentence = text[start:end]
+
+    candidates = []
+    for name, pattern, kind in PATTERNS:
+        for m in pattern.finditer(sentence):
+            candidates.append((m.start("date"), -m.end("date"), name, kind, m))
+
+    # longest expressions first, the ones overlapping them are dropped
+    dates = []
+    covered = 0
+    for s, e, name, kind, m in sorted(candidates):
+        e = -e
+        if s < covered:
+            continue
+        value = date_value(m, kind)
+        if value is None:
+            return None
+        dates.append({"type": "DATE", "value": value, "start": start + s, "end": start + e,
+                      "text": sentence[s:e], "pattern": name})
+        covered = e
+
+    for a, b in zip(dates, dates[1:]):
+        if RANGE_SEPARATOR.match(text[a["end"]:b["start"]]):
+            return None
+
+    # every cue must be inside one of the dates, e.g. "from 1950 to 1960" is left to SUTime as "1960" is not
+    for cues in (CUES, MONTH_CUES):
+        for m in cues.finditer(sentence):
+            if not any([d["start"] <= start + m.start() and start + m.end() <= d["end"] for d in dates]):
+                return None
+    return dates
@@ -0,0 +1,39 @@
+import os
+import json
+
+# Wikimedia language fallbacks e.g. {"gl": ["pt"], "zh_mo": ["zh-hk", "zh-hant", "zh-hans"]}
+FALLBACKS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "datasets", "fallbacks.json")
+
+
+def read_fallbacks(fallbacks_file=FALLBACKS_FILE):
+    with open(fallbacks_file) as f:
+        # "en" has no fallback, written ["false"]
+        return dict((str(k), [str(l) for l in v if l != "false"]) for k, v in json.load(f).items())
+
+
+def fallback_chain(lang, fallbacks):
+    """
+    resolve the fallback chain of a language: the language, its fallbacks, the fallbacks
+    of its fallbacks (breadth first, each language once) and English last
+    :param fallbacks: dict read by read_fallbacks
+    :return: list of languages to try in order, starting with lang
+    """
+    chain = [lang]
+    i = 0
+    while i < len(chain):
+        for l in fallbacks.get(chain[i], []):
+            if l not in chain:
+                chain.append(l)
+        i += 1
+    if 'en' not in chain:
+        chain.append('en')
+    return chain
+
+
+def fallback_chains(langs, fallbacks=None):
+    """
+    :return: dict language -> fallback chain for each of the given languages
+    """
+    if fallbacks is None:
+        fallbacks = read_fallbacks()
+    return dict((lang, fallback_chain(lang, fallbacks)) for lang in langs)
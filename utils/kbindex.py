@@ -0,0 +1,68 @@
+import os
+import json
+import mmap
+import numpy as np
+from utils.kbstore import ArrayKB, ARRAYS, open_kb
+
+INDEX_VERSION = 3
+
+# A KBStore compiled to disk: one .npy file per array of the ArrayKB (see
+# utils.kbstore.build_arrays), the sorted terms in terms.bin and a meta.json.
+
+
+def compile_kb(kb, index_dir):
+    """
+    write a binary index that can be opened with KBIndex
+    :param kb: KBStore or path of a triples file
+    :param index_dir: output folder of the index
+    """
+    kb = open_kb(kb)
+
+    if not os.path.exists(index_dir):
+        os.makedirs(index_dir)
+
+    for name in ARRAYS:
+        np.save(os.path.join(index_dir, "%s.npy" % name), getattr(kb, name))
+
+    with open(os.path.join(index_dir, "terms.bin"), "wb") as f:
+        f.write(kb.terms_blob[:])
+
+    with open(os.path.join(index_dir, "meta.json"), "w") as f:
+        json.dump({"version": INDEX_VERSION,
+                   "triples": len(kb),
+                   "terms": kb.n_terms,
+                   "baseuri": kb.baseuri,
+                   "baseuripred": kb.baseuripred}, f)
+
+    return index_dir
+
+
+class KBIndex(ArrayKB):
+    """
+    read only KB opened from a folder written by compile_kb
+    all arrays are memory mapped, nothing is parsed at startup and the pages are
+    shared through the page cache by every process reading the same index
+    """
+
+    def __init__(self, index_dir):
+
+        with open(os.path.join(index_dir, "meta.json")) as f:
+            meta = json.load(f)
+        if meta["version"] != INDEX_VERSION:
+            raise ValueError("KB index %s has version %s, expected %s" % (index_dir, meta["version"], INDEX_VERSION))
+
+        self.index_dir = index_dir
+        self.baseuri = str(meta["baseuri"])
+        self.baseuripred = str(meta["baseuripred"])
+
+        arrays = {}
+        for name in ARRAYS:
+            arrays[name] = np.load(os.path.join(index_dir, "%s.npy" % name), mmap_mode='r')
+
+        with open(os.path.join(index_dir, "terms.bin"), "rb") as f:
+            if os.fstat(f.fileno()).st_size > 0:
+                terms_blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                terms_blob = ""
+
+        self.set_arrays(arrays, terms_blob)
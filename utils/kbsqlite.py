@@ -0,0 +1,265 @@
+import os
+import sqlite3
+import numpy as np
+from utils.kbstore import BaseKB
+from utils.lrucache import LRUCache
+
+SQLITE_HEADER = "SQLite format 3\x00"
+
+# Disk backed KB for machines where the triples (and labels) do not fit in RAM.
+#
+# Same ids as KBStore: Q/P ids are stored as their number, every other term as
+# -(id) where id is the row of the term in the terms table.
+#   terms(id, term)                              every non Q/P term once
+#   triples(row, subj, pred, obj, obj_entity)    row is the line number in the triples file
+#   labels(entity, lang, label)                  entity is the id without base uri e.g. "Q42"
+# triples are indexed by (subj, obj) and by obj, labels by entity.
+
+_MISSING = object()
+
+
+def is_sqlite(path):
+    if not os.path.isfile(path):
+        return False
+    with open(path, 'rb') as f:
+        return f.read(16) == SQLITE_HEADER
+
+
+def build_sqlite_kb(db_file, triples_file=None, labels_file=None, batch=100000):
+    """
+    build the sqlite database read by SQLiteKB from the triples and labels csv files
+    the files are streamed, only one batch of rows is held in memory at a time
+    :param db_file: output sqlite file, overwritten if it exists
+    :param triples_file: wikidata triples csv file
+    :param labels_file: wikidata labels csv file
+    """
+    if os.path.exists(db_file):
+        os.remove(db_file)
+
+    conn = sqlite3.connect(db_file)
+    conn.text_factory = str
+    c = conn.cursor()
+    c.execute("PRAGMA journal_mode = OFF")
+    c.execute("PRAGMA synchronous = OFF")
+    c.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+    c.execute("CREATE TABLE terms (id INTEGER PRIMARY KEY, term TEXT UNIQUE)")
+    c.execute("CREATE TABLE triples (row INTEGER PRIMARY KEY, subj INTEGER, pred INTEGER, obj INTEGER, obj_entity INTEGER)")
+    c.execute("CREATE TABLE labels (entity TEXT, lang TEXT, label TEXT)")
+
+    kb = BaseKB()
+    term_ids = LRUCache(1000000)
+
+    def intern(uri, base, prefix):
+        i = kb.local_id(uri, base, prefix)
+        if i is not None:
+            return i
+        i = term_ids.get(uri)
+        if i is None:
+            r = c.execute("SELECT id FROM terms WHERE term = ?", (uri,)).fetchone()
+            if r is None:
+                c.execute("INSERT INTO terms (term) VALUES (?)", (uri,))
+                i = -c.lastrowid
+            else:
+                i = -r[0]
+            term_ids.put(uri, i)
+        return i
+
+    n = 0
+    if triples_file is not None:
+        rows = []
+        with open(triples_file) as f:
+            for l in f:
+                tmp = l.split("\t")
+                if len(tmp) != 3:
+                    continue
+                rows.append((intern(tmp[0].strip(), kb.baseuri, "Q"),
+                             intern(tmp[1].strip(), kb.baseuripred, "P"),
+                             intern(tmp[2].strip(), kb.baseuri, "Q"),
+                             int(kb.baseuri in tmp[2])))
+                if len(rows) == batch:
+                    c.executemany("INSERT INTO triples (subj, pred, obj, obj_entity) VALUES (?, ?, ?, ?)", rows)
+                    n += len(rows)
+                    rows = []
+        c.executemany("INSERT INTO triples (subj, pred, obj, obj_entity) VALUES (?, ?, ?, ?)", rows)
+        n += len(rows)
+        c.execute("CREATE INDEX triples_subj_obj ON triples (subj, obj)")
+        c.execute("CREATE INDEX triples_obj ON triples (obj)")
+
+    if labels_file is not None:
+        rows = []
+        with open(labels_file) as f:
+            for l in f:
+                # same parsing as LabelReader
+                tmp = l.decode('unicode-escape').split("\t")
+                if len(tmp) < 3:
+                    continue
+                rows.append((tmp[0].strip().replace(kb.baseuri, ""), tmp[2].replace('.', '').strip(), tmp[1].strip()))
+                if len(rows) == batch:
+                    c.executemany("INSERT INTO labels (entity, lang, label) VALUES (?, ?, ?)", rows)
+                    rows = []
+        c.executemany("INSERT INTO labels (entity, lang, label) VALUES (?, ?, ?)", rows)
+        c.execute("CREATE INDEX labels_entity ON labels (entity)")
+
+    c.execute("INSERT INTO meta VALUES ('triples', ?)", (str(n),))
+    conn.commit()
+    conn.close()
+    return db_file
+
+
+class SQLitePairIndex:
+    """
+    PairIndex interface over the triples table, served from the entity cache when the subject was prefetched
+    """
+
+    def __init__(self, kb):
+        self.kb = kb
+
+    def get_many(self, pairs):
+        res = []
+        for s, o in pairs:
+            cached = self.kb.cache.get(("e", s))
+            if cached is not None:
+                preds = [p for (ss, p, oo) in cached[0] if ss == s and oo == o]
+            else:
+                preds = [r[0] for r in self.kb.db().execute(
+                    "SELECT pred FROM triples WHERE subj = ? AND obj = ? ORDER BY row", (s, o))]
+            res.append(np.array(preds, dtype=np.int32))
+        return res
+
+
+class SQLiteKB(BaseKB):
+    """
+    KB views over a database written by build_sqlite_kb
+    hot entities are kept in an in-process LRU cache, prefetch() loads the entities
+    of a whole batch of documents with a few queries
+    """
+
+    def __init__(self, db_file, cache_size=100000):
+        """
+        :param db_file: sqlite file written by build_sqlite_kb
+        :param cache_size: number of entities, terms and label lists kept in memory
+        """
+        self.db_file = db_file
+        self.cache = LRUCache(cache_size)
+        self.pairs = SQLitePairIndex(self)
+        self.empty = np.zeros(0, dtype=np.int32)
+        self.empty.flags.writeable = False
+
+        self._conn = None
+        self._pid = None
+
+    def db(self):
+        # sqlite connections must not be shared with forked worker processes
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.db_file)
+            self._conn.text_factory = str
+            self._pid = os.getpid()
+        return self._conn
+
+    def term(self, i):
+        t = self.cache.get(("term", i))
+        if t is None:
+            t = self.db().execute("SELECT term FROM terms WHERE id = ?", (i + 1,)).fetchone()[0]
+            self.cache.put(("term", i), t)
+        return t
+
+    def lookup_term(self, uri):
+        i = self.cache.get(("id", uri), _MISSING)
+        if i is _MISSING:
+            r = self.db().execute("SELECT id FROM terms WHERE term = ?", (uri,)).fetchone()
+            i = -r[0] if r is not None else None
+            self.cache.put(("id", uri), i)
+        return i
+
+    def _load(self, ids):
+        """
+        read the triples of the given entity ids and cache, for each of them,
+        (triples in file order, sorted neighbour ids)
+        """
+        ids = list(set(ids))
+        for k in range(0, len(ids), 500):
+            chunk = ids[k:k + 500]
+            marks = ",".join(["?"] * len(chunk))
+            # side 0: the entity is the subject, side 1: the entity is the object
+            rows = self.db().execute(
+                "SELECT 0, row, subj, pred, obj, obj_entity FROM triples WHERE subj IN (%s) "
+                "UNION ALL SELECT 1, row, subj, pred, obj, obj_entity FROM triples WHERE obj IN (%s) AND obj_entity = 1"
+                % (marks, marks), chunk + chunk).fetchall()
+
+            by_entity = dict([(e, []) for e in chunk])
+            for r in rows:
+                by_entity[r[4] if r[0] else r[2]].append(r)
+
+            for e, rs in by_entity.items():
+                rs.sort(key=lambda r: r[1])
+                triples = [(r[2], r[3], r[4]) for r in rs]
+                neighbours = set([r[2] if r[0] else r[4] for r in rs if r[5]])
+                neighbours = np.array(sorted(neighbours), dtype=np.int32)
+                neighbours.flags.writeable = False
+                self.cache.put(("e", e), (triples, neighbours))
+
+    def _entity(self, uri):
+        e = self.lookup(uri)
+        if e is None:
+            return None
+        cached = self.cache.get(("e", e))
+        if cached is None:
+            self._load([e])
+            cached = self.cache.get(("e", e))
+        return e, cached
+
+    def prefetch(self, uris):
+        """
+        load the triples and neighbours of all given entities into the cache in bulk
+        :param uris: e.g. the uris of a batch of documents and of their neighbours
+        """
+        ids = [self.lookup(u) for u in uris]
+        self._load([i for i in ids if i is not None and ("e", i) not in self.cache])
+
+    def get_neighbour_ids(self, uri):
+        r = self._entity(uri)
+        if r is None:
+            return self.empty
+        return r[1][1]
+
+    def get_triples(self, uri):
+        r = self._entity(uri)
+        if r is None:
+            return []
+        return [[self.uri(s), self.pred_uri(p), self.uri(o)] for s, p, o in r[1][0]]
+
+    def get_labels(self, key):
+        """
+        :param key: entity id without base uri e.g. "Q42"
+        :return: list of (lang, label) in file order
+        """
+        labels = self.cache.get(("l", key))
+        if labels is None:
+            self.prefetch_labels([key])
+            labels = self.cache.get(("l", key))
+        return labels
+
+    def prefetch_labels(self, keys):
+        keys = list(set([k for k in keys if ("l", k) not in self.cache]))
+        for k in range(0, len(keys), 500):
+            chunk = keys[k:k + 500]
+            labels = dict([(e, []) for e in chunk])
+            for e, lang, label in self.db().execute(
+                    "SELECT entity, lang, label FROM labels WHERE entity IN (%s) ORDER BY rowid"
+                    % ",".join(["?"] * len(chunk)), chunk):
+                labels[e].append((lang, label.decode('utf-8')))
+            for e, l in labels.items():
+                self.cache.put(("l", e), l)
+
+    def label_entities(self):
+        """
+        :return: iterator over the ids of all entities with labels e.g. "Q42"
+        """
+        for r in self.db().execute("SELECT DISTINCT entity FROM labels"):
+            yield r[0]
+
+    def stats(self):
+        return self.cache.stats()
+
+    def __len__(self):
+        return int(self.db().execute("SELECT value FROM meta WHERE key = 'triples'").fetchone()[0])
@@ -0,0 +1,373 @@
+from array import array
+import os
+import numpy as np
+from utils.pairindex import PairIndex
+from utils.adjacency import AdjacencyIndex
+from utils.properties import read_properties
+
+
+class BaseKB:
+    """
+    views shared by the in-memory KBStore and the memory mapped KBIndex
+
+    Wikidata items (Q123) and properties (P123) are identified by their numeric id,
+    every other term (literals, dates, non-item URIs) by a negative id -(i + 1)
+    where i is the index of the term, returned by self.term(i).
+    Subclasses provide self.pairs (a PairIndex), self.adjacency (an AdjacencyIndex),
+    term, lookup_term and get_triples.
+    """
+
+    baseuri = "http://www.wikidata.org/entity/"
+    baseuripred = "http://www.wikidata.org/prop/direct/"
+
+    def local_id(self, uri, base, prefix):
+        """
+        :param uri: full uri or bare id ("Q42") of an item or property
+        :return: the numeric part of the id, None if uri is not a plain Q/P id
+        """
+        key = uri[len(base):] if uri.startswith(base) else uri
+        if key[:1] == prefix and key[1:].isdigit():
+            return int(key[1:])
+        return None
+
+    def lookup(self, uri, base=None, prefix="Q"):
+        """
+        id of a term without interning it
+        :return: integer id or None if the term never occurs in the triples file
+        """
+        uri = uri.strip()
+        if isinstance(uri, unicode):
+            uri = uri.encode('utf-8')
+        i = self.local_id(uri, self.baseuri if base is None else base, prefix)
+        if i is not None:
+            return i
+        return self.lookup_term(uri)
+
+    def uri(self, i):
+        if i >= 0:
+            return "%sQ%s" % (self.baseuri, i)
+        return self.term(-i - 1)
+
+    def pred_uri(self, i):
+        if i >= 0:
+            return "%sP%s" % (self.baseuripred, i)
+        return self.term(-i - 1)
+
+    def get_predicates(self, suri, objuri):
+        """
+        pair view: predicates linking subject suri to object objuri in file order
+        """
+        return self.get_predicates_many([(suri, objuri)])[0]
+
+    def get_predicates_many(self, pairs):
+        """
+        pair view for a batch of (subject uri, object uri) pairs, answered in one index search
+        :return: list of predicate uri lists, one per pair
+        """
+        ids = [(self.lookup(s), self.lookup(o)) for s, o in pairs]
+        known = [i for i, (s, o) in enumerate(ids) if s is not None and o is not None]
+
+        res = [[] for _ in pairs]
+        for i, preds in zip(known, self.pairs.get_many([ids[i] for i in known])):
+            res[i] = [self.pred_uri(p) for p in preds.tolist()]
+        return res
+
+    def get_neighbour_ids(self, uri):
+        """
+        entity view: sorted read only array of the ids of the entities linked to uri
+        whether it's object or subject
+        """
+        e = self.lookup(uri)
+        if e is None:
+            return self.adjacency.neighbours[0:0]
+        return self.adjacency.get(e)
+
+    def get_neighbours(self, uri):
+        return set([self.uri(i) for i in self.get_neighbour_ids(uri).tolist()])
+
+    def prefetch(self, uris):
+        """
+        load the given entities ahead of a batch of documents, nothing to do for in-memory KBs
+        """
+        pass
+
+
+# names of the flat arrays of an ArrayKB, see build_arrays
+ARRAYS = ["term_offsets", "term_is_entity",
+          "subj_keys", "subj_offsets", "subj_pred", "subj_obj", "subj_rows",
+          "obj_keys", "obj_offsets", "obj_subj", "obj_pred", "obj_rows",
+          "pair_keys", "pair_pred", "adj_keys", "adj_offsets", "adj_neighbours"]
+
+
+def build_arrays(subj, pred, obj, terms, baseuri):
+    """
+    turn the integer columns of a triples file into the flat arrays of an ArrayKB
+
+    Subject side (CSR):  subj_keys[i] is a subject id, its triples are the slice
+                         subj_offsets[i]:subj_offsets[i+1] of subj_pred / subj_obj / subj_rows
+    Object side (CSR):   same layout for entity objects with obj_keys, obj_offsets,
+                         obj_subj, obj_pred and obj_rows
+    Pairs:               pair_keys are the sorted packed (subject, object) keys of a
+                         PairIndex and pair_pred the predicate of each key
+    Neighbours (CSR):    adj_keys, adj_offsets and adj_neighbours of an AdjacencyIndex
+    Terms:               non Q/P terms sorted, stored as one utf-8 string and
+                         term_offsets, term -(i + 1) is the i-th string of the blob
+    *_rows hold the line number of each triple in the triples file, so views
+    return triples in file order.
+
+    :param subj, pred, obj: int32 arrays, non Q/P terms are -(index in terms + 1)
+    :param terms: list of the non Q/P terms
+    :return: (dict of arrays, terms blob)
+    """
+    subj, pred, obj = subj.copy(), pred.copy(), obj.copy()
+
+    # renumber terms in sorted order so they can be looked up by binary search
+    terms = [t.encode('utf-8') if isinstance(t, unicode) else t for t in terms]
+    order = sorted(range(len(terms)), key=terms.__getitem__)
+    rank = np.empty(len(terms) + 1, dtype=np.int32)
+    rank[np.array(order, dtype=np.int64) + 1] = np.arange(len(terms), dtype=np.int32)
+    for col in (subj, pred, obj):
+        neg = col < 0
+        col[neg] = -(rank[-col[neg]] + 1)
+
+    terms = [terms[i] for i in order]
+    term_offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    term_offsets[1:] = np.cumsum([len(t) for t in terms])
+    term_is_entity = np.array([baseuri in t for t in terms], dtype=np.bool_)
+
+    arrays = {"term_offsets": term_offsets, "term_is_entity": term_is_entity}
+
+    # subject side
+    rows = np.argsort(subj, kind='mergesort').astype(np.uint32)
+    keys, starts = np.unique(subj[rows], return_index=True)
+    arrays["subj_keys"] = keys.astype(np.int32)
+    arrays["subj_offsets"] = np.append(starts, len(rows)).astype(np.uint32)
+    arrays["subj_pred"] = pred[rows]
+    arrays["subj_obj"] = obj[rows]
+    arrays["subj_rows"] = rows
+
+    # object side, only objects that are entities themselves
+    is_entity = obj >= 0
+    is_entity[~is_entity] = term_is_entity[-obj[~is_entity] - 1]
+    ent_rows = np.nonzero(is_entity)[0]
+    rows = ent_rows[np.argsort(obj[ent_rows], kind='mergesort')].astype(np.uint32)
+    keys, starts = np.unique(obj[rows], return_index=True)
+    arrays["obj_keys"] = keys.astype(np.int32)
+    arrays["obj_offsets"] = np.append(starts, len(rows)).astype(np.uint32)
+    arrays["obj_subj"] = subj[rows]
+    arrays["obj_pred"] = pred[rows]
+    arrays["obj_rows"] = rows
+
+    adjacency = AdjacencyIndex.build(subj[ent_rows], obj[ent_rows])
+    arrays["adj_keys"] = adjacency.keys
+    arrays["adj_offsets"] = adjacency.offsets
+    arrays["adj_neighbours"] = adjacency.neighbours
+
+    pairs = PairIndex.build(subj, pred, obj)
+    arrays["pair_keys"] = pairs.keys
+    arrays["pair_pred"] = pairs.preds
+
+    return arrays, "".join(terms)
+
+
+class ArrayKB(BaseKB):
+    """
+    KB views over the flat arrays written by build_arrays
+    the whole KB is a few numpy arrays and one string, so processes forked after
+    loading it never touch (and copy) its pages, whether the arrays are in memory
+    (KBStore) or memory mapped (KBIndex)
+    """
+
+    def set_arrays(self, arrays, terms_blob):
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+        self.terms_blob = terms_blob
+        self.n_terms = len(self.term_offsets) - 1
+        self.n_triples = len(self.subj_rows)
+
+        self.pairs = PairIndex(self.pair_keys, self.pair_pred)
+        self.adjacency = AdjacencyIndex(self.adj_keys, self.adj_offsets, self.adj_neighbours)
+
+    def term(self, i):
+        return self.terms_blob[int(self.term_offsets[i]):int(self.term_offsets[i + 1])]
+
+    def lookup_term(self, uri):
+        """
+        binary search over the sorted terms
+        """
+        lo, hi = 0, self.n_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.term(mid) < uri:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.n_terms and self.term(lo) == uri:
+            return -(lo + 1)
+        return None
+
+    def is_entity(self, i):
+        return i >= 0 or bool(self.term_is_entity[-i - 1])
+
+    def _range(self, keys, offsets, e):
+        i = int(np.searchsorted(keys, e))
+        if i < len(keys) and keys[i] == e:
+            return int(offsets[i]), int(offsets[i + 1])
+        return 0, 0
+
+    def get_triples(self, uri):
+        """
+        triples view: [subject, predicate, object] lists the entity takes part in, in file order
+        """
+        e = self.lookup(uri)
+        if e is None:
+            return []
+        a, b = self._range(self.subj_keys, self.subj_offsets, e)
+        c, d = self._range(self.obj_keys, self.obj_offsets, e)
+
+        rows = np.concatenate([self.subj_rows[a:b], self.obj_rows[c:d]])
+        s = np.concatenate([np.full(b - a, e, dtype=np.int32), self.obj_subj[c:d]])
+        p = np.concatenate([self.subj_pred[a:b], self.obj_pred[c:d]])
+        o = np.concatenate([self.subj_obj[a:b], np.full(d - c, e, dtype=np.int32)])
+
+        order = np.argsort(rows, kind='mergesort')
+        return [[self.uri(int(s[i])), self.pred_uri(int(p[i])), self.uri(int(o[i]))] for i in order]
+
+    def nbytes(self):
+        """
+        memory used by the arrays of the KB, in bytes
+        """
+        return sum([getattr(self, name).nbytes for name in ARRAYS]) + len(self.terms_blob)
+
+    def __len__(self):
+        return self.n_triples
+
+
+# One in-memory copy of a wikidata triples file ("subject \t predicate \t object")
+# shared by TripleReader, TripleReaderItems and TripleReaderTriples.
+#
+# Terms are interned once while parsing, then the triples are turned into the
+# flat arrays of an ArrayKB and every parsing structure is dropped.
+#
+# When entities are given (e.g. DataReader.read_uris()) only their neighbourhood
+# is loaded: a first pass over the file finds the entities linked to them and
+# only the triples whose subject or object is one of those entities are kept.
+# When properties are given, triples of any other predicate are dropped while parsing.
+class KBStore(ArrayKB):
+
+    def __init__(self, triples_file, entities=None, properties=None):
+        """
+        :param triples_file: wikidata triples csv file
+        :param entities: optional iterable of entity uris (documents) to project the KB on
+        :param properties: optional whitelist of predicate uris, see utils.properties.read_properties
+        """
+
+        self.terms = []
+        self.term_ids = {}
+
+        subj = array('i')
+        pred = array('i')
+        obj = array('i')
+
+        keep = None
+        if entities is not None:
+            keep = self.neighbourhood(triples_file, entities)
+
+        if properties is not None:
+            properties = set(properties)
+
+        scanned = 0
+        dropped = 0
+        with open(triples_file) as f:
+            for l in f:
+                tmp = l.split("\t")
+                if len(tmp) != 3:
+                    continue
+
+                scanned += 1
+                s, p, o = tmp[0].strip(), tmp[1].strip(), tmp[2].strip()
+                if keep is not None and s not in keep and o not in keep:
+                    continue
+                if properties is not None and p not in properties:
+                    dropped += 1
+                    continue
+
+                subj.append(self.intern(s, self.baseuri, "Q"))
+                pred.append(self.intern(p, self.baseuripred, "P"))
+                obj.append(self.intern(o, self.baseuri, "Q"))
+
+        if keep is not None:
+            print("kept %s of %s triples around %s entities" % (len(subj), scanned, len(keep)))
+
+        arrays, terms_blob = build_arrays(self.column(subj), self.column(pred), self.column(obj), self.terms, self.baseuri)
+        self.set_arrays(arrays, terms_blob)
+        del self.terms
+        del self.term_ids
+
+        if properties is not None:
+            # estimate from the size of what was kept, strings of dropped literals are not counted
+            per_triple = float(self.nbytes()) / max(len(self), 1)
+            print("dropped %s of %s triples outside the %s whitelisted properties, saving about %.1f MB"
+                  % (dropped, len(self) + dropped, len(properties), dropped * per_triple / 2 ** 20))
+
+    def neighbourhood(self, triples_file, entities):
+        """
+        first pass over the triples file
+        :return: set of the given entity uris and of the entities linked to them
+        """
+        entities = set([e.strip() for e in entities])
+        keep = set(entities)
+        with open(triples_file) as f:
+            for l in f:
+                tmp = l.split("\t")
+                if len(tmp) != 3 or self.baseuri not in tmp[2]:
+                    continue
+                subj, obj = tmp[0].strip(), tmp[2].strip()
+                if subj in entities:
+                    keep.add(obj)
+                elif obj in entities:
+                    keep.add(subj)
+        return keep
+
+    def column(self, a):
+        return np.frombuffer(a.tostring(), dtype=np.int32)
+
+    def intern(self, uri, base, prefix):
+        i = self.local_id(uri, base, prefix)
+        if i is not None:
+            return i
+        i = self.term_ids.get(uri)
+        if i is None:
+            self.terms.append(uri)
+            i = -len(self.terms)
+            self.term_ids[uri] = i
+        return i
+
+
+def open_kb(kb, properties=None, top_k=None):
+    """
+    :param kb: path of a triples file, folder of an index compiled with compile_kb.py,
+               sqlite file built with compile_kb.py --sqlite or an already loaded KB
+    :param properties: whitelist of predicate uris or a file of datasets/properties, used when loading a triples file
+    :param top_k: keep only the top k most used properties of the properties file
+    :return: KB to be shared between the triple readers
+    """
+    if isinstance(properties, basestring):
+        properties = read_properties(properties, top_k)
+
+    if isinstance(kb, basestring):
+        from utils.kbsqlite import is_sqlite
+        if not os.path.isdir(kb) and not is_sqlite(kb):
+            return KBStore(kb, properties=properties)
+
+    if properties is not None:
+        raise ValueError("properties are applied while parsing a triples file, "
+                         "give them to KBStore or compile_kb.py instead")
+
+    if isinstance(kb, basestring) and os.path.isdir(kb):
+        from utils.kbindex import KBIndex
+        return KBIndex(kb)
+    if isinstance(kb, basestring):
+        from utils.kbsqlite import SQLiteKB
+        return SQLiteKB(kb)
+    return kb
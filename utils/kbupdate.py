@@ -0,0 +1,202 @@
+import hashlib
+import os
+import shutil
+import numpy as np
+from utils.kbstore import ArrayKB, build_arrays
+from utils.kbindex import KBIndex, compile_kb
+
+# Incremental update of a compiled KB index from a newer dump.
+#
+# Two snapshots (triples / labels csv files or compiled indexes) are compared by
+# 64-bit hashes of their normalised lines, so only the hashes of both snapshots
+# and the changed lines are held in memory. The changes are then applied to the
+# integer columns of the compiled index, without parsing the whole dump again.
+
+
+def tsv_triples(triples_file):
+    """
+    normalised "subject \t predicate \t object" lines of a triples csv file
+    """
+    with open(triples_file) as f:
+        for l in f:
+            tmp = l.split("\t")
+            if len(tmp) == 3:
+                yield "%s\t%s\t%s" % (tmp[0].strip(), tmp[1].strip(), tmp[2].strip())
+
+
+def index_triples(index_dir):
+    """
+    normalised "subject \t predicate \t object" lines of a compiled index
+    """
+    kb = KBIndex(index_dir)
+    n = len(kb)
+    subj = np.empty(n, dtype=np.int32)
+    subj[kb.subj_rows] = np.repeat(kb.subj_keys, np.diff(kb.subj_offsets.astype(np.int64)))
+    pred = np.empty(n, dtype=np.int32)
+    pred[kb.subj_rows] = kb.subj_pred
+    obj = np.empty(n, dtype=np.int32)
+    obj[kb.subj_rows] = kb.subj_obj
+    for s, p, o in zip(subj.tolist(), pred.tolist(), obj.tolist()):
+        yield "%s\t%s\t%s" % (kb.uri(s), kb.pred_uri(p), kb.uri(o))
+
+
+def tsv_labels(labels_file):
+    """
+    lines of a labels csv file that LabelReader would read
+    """
+    with open(labels_file) as f:
+        for l in f:
+            if len(l.split("\t")) >= 3:
+                yield l.rstrip("\n")
+
+
+def snapshot(path):
+    """
+    :return: function returning a fresh iterator over the triples of a csv file or a compiled index
+    """
+    if os.path.isdir(path):
+        return lambda: index_triples(path)
+    return lambda: tsv_triples(path)
+
+
+def line_hash(l):
+    if isinstance(l, unicode):
+        l = l.encode('utf-8')
+    return np.frombuffer(hashlib.md5(l).digest()[:8], dtype=np.int64)[0]
+
+
+def diff(old, new):
+    """
+    :param old: function returning a fresh iterator over the lines of the old snapshot
+    :param new: function returning a fresh iterator over the lines of the new snapshot
+    :return: (added lines, removed lines)
+    """
+    old_h = np.unique(np.fromiter((line_hash(l) for l in old()), dtype=np.int64))
+    new_h = np.unique(np.fromiter((line_hash(l) for l in new()), dtype=np.int64))
+
+    added_h = set(np.setdiff1d(new_h, old_h, assume_unique=True).tolist())
+    removed_h = set(np.setdiff1d(old_h, new_h, assume_unique=True).tolist())
+
+    added = [l for l in new() if line_hash(l) in added_h] if added_h else []
+    removed = [l for l in old() if line_hash(l) in removed_h] if removed_h else []
+    return added, removed
+
+
+def filter_triples(triples, properties):
+    """
+    :param triples: "subject \t predicate \t object" lines
+    :param properties: whitelist of predicate uris, None to keep every line
+    :return: the lines of the whitelisted predicates
+    """
+    if properties is None:
+        return triples
+    return [l for l in triples if l.split("\t")[1] in properties]
+
+
+def apply_triples(index_dir, added, removed, out_dir, properties=None):
+    """
+    write a new index: the triples of index_dir without the removed ones and with the added ones
+    :param added: "subject \t predicate \t object" lines to add
+    :param removed: "subject \t predicate \t object" lines to remove
+    :param out_dir: output folder, may be index_dir itself
+    :param properties: whitelist the index was compiled with, added triples of other predicates are skipped
+    :return: the updated KB
+    """
+    kb = KBIndex(index_dir)
+    n = len(kb)
+
+    # integer columns in row order
+    subj = np.empty(n, dtype=np.int32)
+    subj[kb.subj_rows] = np.repeat(kb.subj_keys, np.diff(kb.subj_offsets.astype(np.int64)))
+    pred = np.empty(n, dtype=np.int32)
+    pred[kb.subj_rows] = kb.subj_pred
+    obj = np.empty(n, dtype=np.int32)
+    obj[kb.subj_rows] = kb.subj_obj
+
+    keep = np.ones(n, dtype=np.bool_)
+    for l in removed:
+        s, p, o = l.split("\t")
+        s, p, o = kb.lookup(s), kb.lookup(p, kb.baseuripred, "P"), kb.lookup(o)
+        if s is None or p is None or o is None:
+            continue
+        a, b = kb._range(kb.subj_keys, kb.subj_offsets, s)
+        keep[kb.subj_rows[a:b][(kb.subj_obj[a:b] == o) & (kb.subj_pred[a:b] == p)]] = False
+
+    terms = [kb.term(i) for i in range(kb.n_terms)]
+    new_terms = {}
+
+    def intern(uri, base, prefix):
+        i = kb.lookup(uri, base, prefix)
+        if i is None:
+            i = new_terms.get(uri)
+            if i is None:
+                terms.append(uri)
+                i = -len(terms)
+                new_terms[uri] = i
+        return i
+
+    add_s, add_p, add_o = [], [], []
+    for l in added:
+        s, p, o = l.split("\t")
+        if properties is not None and p not in properties:
+            continue
+        add_s.append(intern(s, kb.baseuri, "Q"))
+        add_p.append(intern(p, kb.baseuripred, "P"))
+        add_o.append(intern(o, kb.baseuri, "Q"))
+
+    subj = np.concatenate([subj[keep], np.array(add_s, dtype=np.int32)])
+    pred = np.concatenate([pred[keep], np.array(add_p, dtype=np.int32)])
+    obj = np.concatenate([obj[keep], np.array(add_o, dtype=np.int32)])
+
+    updated = ArrayKB()
+    updated.baseuri = kb.baseuri
+    updated.baseuripred = kb.baseuripred
+    updated.set_arrays(*build_arrays(subj, pred, obj, terms, kb.baseuri))
+
+    # the old index may still be memory mapped, write next to it and swap the folders
+    tmp_dir = out_dir.rstrip("/") + ".tmp"
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    compile_kb(updated, tmp_dir)
+    if os.path.exists(out_dir):
+        shutil.rmtree(out_dir)
+    os.rename(tmp_dir, out_dir)
+
+    print("removed %s and added %s triples, %s triples in %s" % (n - keep.sum(), len(add_s), len(updated), out_dir))
+    return updated
+
+
+def affected_entities(kbs, triples, labels):
+    """
+    entities whose documents can get a different annotation after the update
+    a document D uses the triples between D and the entities linked in it (its neighbours
+    and literals such as dates) and the labels of its neighbours, so for a changed triple
+    (s, p, o) D is one of s, o or a common neighbour of s and o, for a changed label of e
+    D is e or one of its neighbours
+    :param kbs: the KBs before and after the update
+    :param triples: changed "subject \t predicate \t object" lines
+    :param labels: changed label lines
+    :return: set of entity uris
+    """
+    affected = set()
+    for l in triples:
+        s, p, o = l.split("\t")
+        affected.add(s)
+        for kb in kbs:
+            ns = set(kb.get_neighbour_ids(s).tolist())
+            if kb.baseuri in o:
+                affected.add(o)
+                common = ns & set(kb.get_neighbour_ids(o).tolist())
+            else:
+                common = ns
+            affected.update([kb.uri(i) for i in common])
+
+    for l in labels:
+        e = l.split("\t")[0].strip()
+        if not e.startswith(kbs[0].baseuri):
+            e = kbs[0].baseuri + e
+        affected.add(e)
+        for kb in kbs:
+            affected.update(kb.get_neighbours(e))
+
+    return affected
@@ -0,0 +1,216 @@
+import os
+import json
+import mmap
+from array import array
+import numpy as np
+from utils.fallbacks import read_fallbacks, fallback_chains
+from utils.labelparser import parse_labels
+
+LABEL_INDEX_VERSION = 2
+
+# Labels csv file compiled to disk, read by LabelReader with mmap.
+#
+#   entities.bin, entity_offsets.npy   sorted entity ids without base uri e.g. "Q42"
+#   strings.bin, string_offsets.npy    every distinct label once, utf-8
+#   lang-<lang>/keys.npy               sorted ranks of the entities with labels in <lang>
+#   lang-<lang>/offsets.npy            labels of keys[i] are labels[offsets[i]:offsets[i+1]]
+#   lang-<lang>/labels.npy             string ids, in the order of the labels file
+#   meta.json                          counts, languages and the fallback chain of each language
+
+
+def _open_blob(path):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size > 0:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return ""
+
+
+def _write_strings(path, offsets_path, strings):
+    offsets = np.zeros(len(strings) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(s) for s in strings])
+    np.save(offsets_path, offsets)
+    with open(path, "wb") as f:
+        for s in strings:
+            f.write(s)
+
+
+def compile_labels(labels_file, index_dir, baseuri="http://www.wikidata.org/entity/", fallbacks=None, workers=None):
+    """
+    write a label index that can be opened with LabelIndex
+    labels are parsed as LabelReader does: "Q12345 \t 'Count von Count' \t en ."
+    :param labels_file: wikidata labels csv file
+    :param index_dir: output folder of the index
+    :param fallbacks: language fallbacks (see utils.fallbacks.read_fallbacks), datasets/fallbacks.json by default
+    :param workers: number of processes parsing the labels file, one per core by default
+    """
+    entity_ids = {}
+    string_ids = {}
+    rows = {}
+
+    def intern(d, s):
+        i = d.get(s)
+        if i is None:
+            i = len(d)
+            d[s] = i
+        return i
+
+    n = 0
+    for lang, entity_id, label in parse_labels(labels_file, workers=workers, baseuri=baseuri):
+        lang = lang.encode('utf-8')
+        if lang not in rows:
+            rows[lang] = (array('i'), array('i'))
+        e, s = rows[lang]
+        e.append(intern(entity_ids, entity_id.encode('utf-8')))
+        s.append(intern(string_ids, label.encode('utf-8')))
+        n += 1
+
+    if not os.path.exists(index_dir):
+        os.makedirs(index_dir)
+
+    # entities sorted so that they can be looked up by binary search
+    entities = sorted(entity_ids, key=entity_ids.get)
+    order = sorted(range(len(entities)), key=entities.__getitem__)
+    rank = np.empty(len(entities), dtype=np.int32)
+    rank[np.array(order, dtype=np.int64)] = np.arange(len(entities), dtype=np.int32)
+    _write_strings(os.path.join(index_dir, "entities.bin"), os.path.join(index_dir, "entity_offsets.npy"),
+                   [entities[i] for i in order])
+    del entities, entity_ids
+
+    _write_strings(os.path.join(index_dir, "strings.bin"), os.path.join(index_dir, "string_offsets.npy"),
+                   sorted(string_ids, key=string_ids.get))
+    n_strings = len(string_ids)
+    del string_ids
+
+    for lang, (e, s) in rows.items():
+        e = rank[np.frombuffer(e.tostring(), dtype=np.int32)]
+        s = np.frombuffer(s.tostring(), dtype=np.int32)
+        # stable sort keeps the labels of each entity in file order
+        order = np.argsort(e, kind='mergesort')
+        keys, starts = np.unique(e[order], return_index=True)
+
+        lang_dir = os.path.join(index_dir, "lang-%s" % lang)
+        if not os.path.exists(lang_dir):
+            os.makedirs(lang_dir)
+        np.save(os.path.join(lang_dir, "keys.npy"), keys.astype(np.int32))
+        np.save(os.path.join(lang_dir, "offsets.npy"), np.append(starts, len(e)).astype(np.int64))
+        np.save(os.path.join(lang_dir, "labels.npy"), s[order])
+
+    if fallbacks is None:
+        fallbacks = read_fallbacks()
+    chains = fallback_chains(set(rows) | set(fallbacks), fallbacks)
+
+    with open(os.path.join(index_dir, "meta.json"), "w") as f:
+        json.dump({"version": LABEL_INDEX_VERSION,
+                   "labels": n,
+                   "entities": len(rank),
+                   "strings": n_strings,
+                   "languages": sorted(rows),
+                   "fallbacks": chains,
+                   "baseuri": baseuri}, f)
+
+    return index_dir
+
+
+class LabelIndex:
+    """
+    read only labels of a folder written by compile_labels
+    nothing is parsed at startup, the partition of a language is only mapped
+    the first time one of its labels is read
+    """
+
+    def __init__(self, index_dir):
+
+        with open(os.path.join(index_dir, "meta.json")) as f:
+            meta = json.load(f)
+        if meta["version"] != LABEL_INDEX_VERSION:
+            raise ValueError("label index %s has version %s, expected %s"
+                             % (index_dir, meta["version"], LABEL_INDEX_VERSION))
+
+        self.index_dir = index_dir
+        self.baseuri = str(meta["baseuri"])
+        self.languages = [str(l) for l in meta["languages"]]
+        self.n_entities = meta["entities"]
+        self.fallbacks = dict((str(k), [str(l) for l in v]) for k, v in meta["fallbacks"].items())
+
+        self.entity_offsets = np.load(os.path.join(index_dir, "entity_offsets.npy"), mmap_mode='r')
+        self.entity_blob = _open_blob(os.path.join(index_dir, "entities.bin"))
+        self.string_offsets = np.load(os.path.join(index_dir, "string_offsets.npy"), mmap_mode='r')
+        self.string_blob = _open_blob(os.path.join(index_dir, "strings.bin"))
+
+        self.partitions = {}
+
+    def partition(self, lang):
+        """
+        :return: (keys, offsets, labels) arrays of a language or None if it has no labels
+        """
+        if lang not in self.partitions:
+            lang_dir = os.path.join(self.index_dir, "lang-%s" % lang)
+            if lang in self.languages:
+                self.partitions[lang] = tuple(np.load(os.path.join(lang_dir, "%s.npy" % name), mmap_mode='r')
+                                              for name in ("keys", "offsets", "labels"))
+            else:
+                self.partitions[lang] = None
+        return self.partitions[lang]
+
+    def entity(self, key):
+        """
+        :param key: entity id without base uri e.g. "Q42"
+        :return: rank of the entity or None
+        """
+        if isinstance(key, unicode):
+            key = key.encode('utf-8')
+        lo, hi = 0, self.n_entities
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.entity_blob[int(self.entity_offsets[mid]):int(self.entity_offsets[mid + 1])] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.n_entities and self.entity_blob[int(self.entity_offsets[lo]):int(self.entity_offsets[lo + 1])] == key:
+            return lo
+        return None
+
+    def string(self, i):
+        return self.string_blob[int(self.string_offsets[i]):int(self.string_offsets[i + 1])].decode('utf-8')
+
+    def _get(self, e, lang):
+        part = self.partition(lang)
+        if part is None:
+            return []
+        keys, offsets, labels = part
+        i = int(np.searchsorted(keys, e))
+        if i < len(keys) and keys[i] == e:
+            return [self.string(s) for s in labels[int(offsets[i]):int(offsets[i + 1])].tolist()]
+        return []
+
+    def get(self, key, lang):
+        """
+        :param key: entity id without base uri e.g. "Q42"
+        :return: list of the labels of the entity in lang, in file order
+        """
+        e = self.entity(key)
+        if e is None:
+            return []
+        return self._get(e, lang)
+
+    def get_langs(self, key, langs=None):
+        """
+        :param langs: languages to read, all of them by default
+        :return: dict language -> labels of the entity, only languages with labels are given
+        """
+        e = self.entity(key)
+        if e is None:
+            return {}
+        res = {}
+        for lang in self.languages if langs is None else langs:
+            p = self._get(e, lang)
+            if p:
+                res[lang] = p
+        return res
+
+    def entities(self):
+        """
+        :return: iterator over the ids of all entities with labels e.g. "Q42", in sorted order
+        """
+        for i in range(self.n_entities):
+            yield self.entity_blob[int(self.entity_offsets[i]):int(self.entity_offsets[i + 1])]
@@ -0,0 +1,90 @@
+import os
+import time
+import multiprocessing
+
+BASEURI = "http://www.wikidata.org/entity/"
+
+# Parallel parsing of a wikidata labels csv file formatted as "Q12345 \t 'Count von Count' \t en ."
+# The file is cut into byte ranges aligned on newlines that are parsed by a process pool,
+# the results come back in file order.
+
+
+def byte_ranges(labels_file, chunk):
+    """
+    :param chunk: approximate size of each range in bytes
+    :return: list of (start, end) byte offsets, each range starts at the beginning of a line
+    """
+    size = os.path.getsize(labels_file)
+    ranges = []
+    with open(labels_file, "rb") as f:
+        start = 0
+        while start < size:
+            f.seek(min(start + chunk, size))
+            f.readline()
+            end = min(f.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def parse_range(args):
+    """
+    :param args: (labels file, start, end, languages to keep or None, base uri)
+    :return: (number of lines, list of (lang, entity id, label)) in file order
+    """
+    labels_file, start, end, langs, baseuri = args
+    rows = []
+    n = 0
+    with open(labels_file, "rb") as f:
+        f.seek(start)
+        lines = f.read(end - start).split("\n")
+    if lines and not lines[-1]:
+        lines.pop()
+    for l in lines:
+        n += 1
+        # without escapes unicode-escape decoding is plain latin-1 decoding, which is much
+        # faster, so only the lines with a backslash go through it
+        tmp = (l.decode('unicode-escape') if "\\" in l else l.decode('latin-1')).split("\t")
+        if len(tmp) < 3:
+            continue
+        lang = tmp[2].replace('.', '').strip()
+        if langs is not None and lang not in langs:
+            continue
+        entity_id = tmp[0].strip().replace(baseuri, "")
+        label = tmp[1].strip()
+        rows.append((lang, entity_id, label))
+    return n, rows
+
+
+def parse_labels(labels_file, langs=None, workers=None, chunk=1 << 26, baseuri=BASEURI):
+    """
+    parse a labels csv file in parallel, as LabelReader used to line by line
+    :param langs: only keep the labels of these languages, all by default
+    :param workers: number of processes, one per core by default
+    :param chunk: size in bytes of the ranges given to each process
+    :return: iterator over the (lang, entity id, label) of the file in file order, all unicode
+    """
+    if langs is not None:
+        langs = set(langs)
+    tasks = [(labels_file, start, end, langs, baseuri) for start, end in byte_ranges(labels_file, chunk)]
+
+    start = time.time()
+    n = 0
+    if len(tasks) <= 1 or workers == 1:
+        results = (parse_range(t) for t in tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers or multiprocessing.cpu_count())
+        results = pool.imap(parse_range, tasks)
+
+    try:
+        for lines, rows in results:
+            n += lines
+            for r in rows:
+                yield r
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+    elapsed = max(time.time() - start, 1e-6)
+    print("parsed %s label lines in %.1fs, %.0f lines/s" % (n, elapsed, n / elapsed))
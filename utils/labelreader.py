@@ -1,81 +1,121 @@
-from collections import defaultdict
-import json
+import os
+from utils.kbsqlite import is_sqlite, SQLiteKB
+from utils.labelindex import LabelIndex
+from utils.fallbacks import read_fallbacks, fallback_chain
+from utils.labelparser import parse_labels
 
-# create a defaultdict {entity:[label, alias, alias], entity:[label, alias]}
+# create a dict {lang: {entity:[label, alias, alias], entity:[label, alias]}}
 # from a csv file of labels formatted as "Q12345 \t 'Count von Count' \t en"
-# TODO: language fallback
+# one instance serves every language it was loaded with, the Wikimedia language
+# fallback chains are resolved once when loading
 class LabelReader:
 
-    def __init__(self, labels_file, lang=None, enable_fallback=False):
-        self.fallback = []
-
+    def __init__(self, labels_file, lang=None, enable_fallback=False, langs=None, workers=None):
+        """
+        :param labels_file: labels csv file, label index folder (compile_labels.py) or sqlite KB (compile_kb.py --sqlite)
+        :param lang: default language of get(), labels of all languages if None
+        :param enable_fallback: if an entity has no label in a language return the labels
+        of the first language of its fallback chain that has some
+        :param langs: languages get() can be asked for, only their labels (and those of their
+        fallback languages) are loaded from a csv file. default: lang, or all languages if lang is None
+        :param workers: number of processes parsing a csv file, one per core by default
+        """
         self.baseuri = "http://www.wikidata.org/entity/"
 
-        self.d = defaultdict(list)
-        self.fallback_d = defaultdict(list)
+        self.lang = lang
+        self.enable_fallback = enable_fallback
+        if langs is None and lang is not None:
+            langs = [lang]
+        self.langs = langs
+        self.chains = {}
+
+        self.d = {}
+        self.db = None
+        self.index = None
 
-        if lang and enable_fallback:
-            self.fallback_langs = self.getLangFallback(lang) 
+        # labels that do not fit in memory are read from a sqlite KB built with compile_kb.py --sqlite
+        if is_sqlite(labels_file):
+            self.db = SQLiteKB(labels_file)
+            self.fallbacks = read_fallbacks()
+            return
 
-        with open(labels_file) as f:
-            for l in f:
-                tmp = l.decode('unicode-escape').split("\t")
-                if len(tmp) < 3:
-                    continue
-                entity_id = tmp[0].strip().replace(self.baseuri, "")
-                tmp_lang = tmp[2].replace('.','').strip()
+        # label index compiled with compile_labels.py, memory mapped instead of parsed
+        # its fallback chains were resolved when it was compiled
+        if os.path.isdir(labels_file):
+            self.index = LabelIndex(labels_file)
+            self.chains = dict(self.index.fallbacks) if enable_fallback else {}
+            return
 
-                #if no language is set
-                if lang == None:
-                    self.d[entity_id].append(tmp[1].strip())
-                    continue
-                #if language is set
-                if tmp_lang == lang:
-                    self.d[entity_id].append(tmp[1].strip())
-                # if language fallback is enabled
-                elif enable_fallback and tmp_lang in self.fallback_langs:
-                    if not entity_id in self.fallback_d:
-                        self.fallback_d[entity_id] = {}
-                    if not tmp_lang in self.fallback_d[entity_id]:
-                        self.fallback_d[entity_id][tmp_lang] = [tmp[1].strip()]
-                    else:
-                        self.fallback_d[entity_id][tmp_lang].append(tmp[1].strip())
+        self.fallbacks = read_fallbacks()
+        load = None
+        if langs is not None:
+            load = set([l for tmp_lang in langs for l in self.chain(tmp_lang)])
 
-        # Needs proper testing and some more thought towards performance
-        # if fallback is wanted, call the function to add lang fallbacks to the dict
-        if enable_fallback:
-            self.d = self.doLangFallback(self.d, self.fallback_d, self.fallback_langs)
+        # labels repeated across languages are stored once
+        strings = {}
+        for tmp_lang, entity_id, label in parse_labels(labels_file, load, workers, baseuri=self.baseuri):
+            label = strings.setdefault(label, label)
+            self.d.setdefault(tmp_lang, {}).setdefault(entity_id, []).append(label)
 
-    def get(self, uri):
-        p = []
+    def chain(self, lang):
+        """
+        :return: languages whose labels are tried in order for lang
+        """
+        if lang not in self.chains:
+            if not self.enable_fallback:
+                self.chains[lang] = [lang]
+            elif self.index is not None:
+                self.chains[lang] = [lang] if lang == 'en' else [lang, 'en']
+            else:
+                self.chains[lang] = fallback_chain(lang, self.fallbacks)
+        return self.chains[lang]
+
+    def get(self, uri, lang=None):
+        """
+        :param uri: entity uri or id e.g. "Q42"
+        :param lang: language of the labels, by default the language given at init
+        :return: list of labels of the entity, with the language fallback applied if enabled
+        """
         key = uri.strip().replace(self.baseuri, "")
-        if key in self.d:
-            p = self.d[key]
-        return p
+        if lang is None:
+            lang = self.lang
+        if lang is None:
+            return self.getAll(key)
+
+        for tmp_lang in self.chain(lang):
+            p = self.getLang(key, tmp_lang)
+            if p:
+                return p
+        return []
 
-    # get the language fallback chain for a given language
-    # language fallback as of Wikimedia language fallbacks
-    def getLangFallback(self, lang):
-        fallback = []
-        # always fallback to English
-        if not lang == 'en': 
-            fallback.append('en')
-        # load json file with all fallbacks
-        with open('./datasets/fallbacks.json') as data_file:    
-            fallbacks = json.load(data_file)
-            if lang in fallbacks:
-                fallback.extend(fallbacks[lang])
-        return fallback
+    def getLang(self, key, lang):
+        if self.index is not None:
+            return self.index.get(key, lang)
+        if self.db is not None:
+            return [l for tmp_lang, l in self.db.get_labels(key) if tmp_lang == lang]
+        return self.d.get(lang, {}).get(key, [])
 
-    def doLangFallback(self, d, fall, langs):
-        # add fallbacks for missing values
-        for k,v in fall.iteritems():
-            if not k in d:
-                for lang in langs:
-                    if lang in fall[k]:
-                        d[k] = fall[k][lang]
-                        continue
-        return d
+    def getAll(self, key):
+        if self.index is not None:
+            labels = self.index.get_langs(key)
+            return [l for tmp_lang in self.index.languages for l in labels.get(tmp_lang, [])]
+        if self.db is not None:
+            return [l for tmp_lang, l in self.db.get_labels(key)]
+        return [l for tmp_lang in sorted(self.d) for l in self.d[tmp_lang].get(key, [])]
 
+    def entities(self):
+        """
+        :return: iterator over the ids (e.g. "Q42") of the entities that have labels in any loaded language
+        """
+        if self.index is not None:
+            return self.index.entities()
+        if self.db is not None:
+            return self.db.label_entities()
+        return iter(set([e for labels in self.d.values() for e in labels]))
 
-        
\ No newline at end of file
+    def prefetch(self, uris):
+        """
+        load the labels of a batch of entities in bulk when they are read from sqlite
+        """
+        if self.db is not None:
+            self.db.prefetch_labels([uri.strip().replace(self.baseuri, "") for uri in uris])
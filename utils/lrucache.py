@@ -0,0 +1,53 @@
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    bounded mapping that evicts the least recently used key once maxsize keys are stored
+    keeps hit / miss counts so the cache can be sized from its stats()
+    """
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self.d = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        if key in self.d:
+            self.hits += 1
+            value = self.d.pop(key)
+            self.d[key] = value
+            return value
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        if key in self.d:
+            self.d.pop(key)
+        elif self.maxsize is not None and len(self.d) >= self.maxsize:
+            self.d.popitem(last=False)
+        self.d[key] = value
+
+    def __contains__(self, key):
+        return key in self.d
+
+    def __len__(self):
+        return len(self.d)
+
+    def items(self):
+        """
+        :return: list of the (key, value) pairs, least recently used first, without touching them
+        """
+        return self.d.items()
+
+    def clear(self):
+        self.d.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"size": len(self.d),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": float(self.hits) / total if total else 0.0}
@@ -1,3 +1,14 @@
+# -*- coding: utf-8 -*-
+import re
+from collections import deque
+
+# delimiters around the labels matched by KeywordMatchingEntityLinker
+KEYWORD_DELIMS = u"\".؟()[]?,' "
+
+# Multi-pattern search: AhoCorasick and RabinKarp find all the occurrences of a list of
+# strings, find_all builds re.finditer-like results on top of them (case folding, \b word
+# boundaries) and delimited_matches those of KeywordMatchingEntityLinker.
+
 
 def string_matching_rabin_karp(text='', pattern='', hash_base=256):
     """Returns positions where pattern is found in text.
@@ -17,6 +28,8 @@ def string_matching_rabin_karp(text='', pattern='', hash_base=256):
     offsets = []
     htext = hash_value(text[:m], hash_base)
     hpattern = hash_value(pattern, hash_base)
+    # weight of the character leaving the window, computed once
+    high = hash_base ** (m-1)
     for i in range(n-m+1):
         if htext == hpattern:
             if text[i:i+m] == pattern:
@@ -24,8 +37,7 @@ def string_matching_rabin_karp(text='', pattern='', hash_base=256):
         if i < n-m:
             htext = (hash_base *
                      (htext -
-                      (ord(text[i]) *
-                       (hash_base ** (m-1))))) + ord(text[i+m])
+                      (ord(text[i]) * high))) + ord(text[i+m])
 
     return offsets
 
@@ -83,3 +95,260 @@ def compute_prefix_function(p):
             k = k + 1
         pi[q] = k
     return pi
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton over a list of strings, finds all their occurrences
+    (overlapping ones included) in a single pass over a text
+    """
+
+    def __init__(self, patterns):
+        """
+        :param patterns: list of non empty strings, a pattern is referred to by its index
+        """
+        self.patterns = list(patterns)
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+
+        for i, p in enumerate(self.patterns):
+            s = 0
+            for c in p:
+                t = self.goto[s].get(c)
+                if t is None:
+                    t = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                    self.goto[s][c] = t
+                s = t
+            self.out[s].append(i)
+
+        # breadth first, the fail state of a state is the longest suffix of it that is also a prefix of a pattern
+        queue = deque(self.goto[0].values())
+        while queue:
+            s = queue.popleft()
+            for c, t in self.goto[s].items():
+                queue.append(t)
+                f = self.fail[s]
+                while f and c not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[t] = self.goto[f].get(c, 0)
+                self.out[t] = self.out[t] + self.out[self.fail[t]]
+
+    def finditer(self, text):
+        """
+        :return: iterator over the (start, end, pattern index) of all occurrences, ordered by end
+        """
+        goto, fail, out, patterns = self.goto, self.fail, self.out, self.patterns
+        s = 0
+        for i, c in enumerate(text):
+            while s and c not in goto[s]:
+                s = fail[s]
+            s = goto[s].get(c, 0)
+            for p in out[s]:
+                yield i + 1 - len(patterns[p]), i + 1, p
+
+
+def delimited_matches_regex(text, pattern, delims=KEYWORD_DELIMS):
+    """
+    spans of pattern in text that are preceded and followed by a delimiter or the text boundaries
+    one regex scan: re.finditer of (^|[delims])(pattern)([delims]|$), delimiters are consumed
+    so two matches cannot share one
+    :return: list of (start, end)
+    """
+    d = re.escape(delims)
+    return [m.span(2) for m in re.finditer(r"(^|[%s])(%s)([%s]|$)" % (d, re.escape(pattern), d), text)]
+
+
+def delimited_matches(text, patterns, delims=KEYWORD_DELIMS):
+    """
+    delimited_matches_regex for many patterns at once, with one pass of an Aho-Corasick automaton
+    :param patterns: iterable of strings
+    :return: dict pattern -> list of (start, end), the same spans as delimited_matches_regex
+    """
+    delim_set = frozenset(delims)
+    res = dict((p, []) for p in patterns)
+    keys = [p for p in res if p]
+    n = len(text)
+
+    # position where the regex scan of each pattern would resume
+    pos = dict((p, 0) for p in keys)
+    for start, end, i in AhoCorasick(keys).finditer(text):
+        p = keys[i]
+        # leading (^|[delims]), the delimiter must not have been consumed by the previous match
+        if start == 0:
+            if pos[p] != 0:
+                continue
+        elif start - 1 < pos[p] or text[start - 1] not in delim_set:
+            continue
+        # trailing ([delims]|$), $ also matches before a final newline
+        if end < n and text[end] in delim_set:
+            pos[p] = end + 1
+        elif end == n or (end == n - 1 and text[end] == "\n"):
+            pos[p] = end
+        else:
+            continue
+        res[p].append((start, end))
+
+    if "" in res:
+        res[""] = delimited_matches_regex(text, "", delims)
+    return res
+
+
+class RabinKarp:
+    """
+    Rabin-Karp search of many patterns: one rolling hash per distinct pattern length,
+    the windows whose hash is the one of a pattern are compared with it
+    """
+
+    def __init__(self, patterns, base=1000003, modulus=2147483647):
+        """
+        :param patterns: list of strings, a pattern is referred to by its index, empty ones are never found
+        :param base: base of the polynomial hash
+        :param modulus: prime modulus of the hash, small enough that the products stay machine integers
+        """
+        self.patterns = list(patterns)
+        self.base = base
+        self.modulus = modulus
+        # pattern length -> (base ** (length - 1) % modulus, {hash: [pattern indices]})
+        self.groups = {}
+        for i, p in enumerate(self.patterns):
+            if not p:
+                continue
+            if len(p) not in self.groups:
+                self.groups[len(p)] = (pow(base, len(p) - 1, modulus), {})
+            self.groups[len(p)][1].setdefault(self.hash([ord(c) for c in p]), []).append(i)
+
+    def hash(self, codes):
+        h = 0
+        for c in codes:
+            h = (h * self.base + c) % self.modulus
+        return h
+
+    def finditer(self, text):
+        """
+        :return: iterator over the (start, end, pattern index) of all occurrences, in the order of AhoCorasick.finditer
+        """
+        base, modulus, patterns = self.base, self.modulus, self.patterns
+        codes = [ord(c) for c in text]
+        n = len(codes)
+        found = []
+        for m, (high, table) in self.groups.items():
+            if m > n:
+                continue
+            h = self.hash(codes[:m])
+            for i in xrange(n - m + 1):
+                if h in table:
+                    window = text[i:i + m]
+                    for p in table[h]:
+                        if patterns[p] == window:
+                            found.append((i + m, i, p))
+                if i + m < n:
+                    h = ((h - codes[i] * high) * base + codes[i + m]) % modulus
+        found.sort()
+        for end, start, p in found:
+            yield start, end, p
+
+
+MATCHERS = {"aho-corasick": AhoCorasick, "rabin-karp": RabinKarp}
+
+
+def is_word_char(c, unicode=True):
+    """
+    :param unicode: word characters of re.UNICODE, else those of the default flags [a-zA-Z0-9_]
+    """
+    if unicode:
+        return c.isalnum() or c == u"_"
+    return c < u"\x80" and (c.isalnum() or c == u"_")
+
+
+def is_word_boundary(text, i, unicode=True):
+    """
+    :return: True if the regex \\b matches at position i of text
+    """
+    before = i > 0 and is_word_char(text[i - 1], unicode)
+    after = i < len(text) and is_word_char(text[i], unicode)
+    return before != after
+
+
+def find_all_regex(text, patterns, ignore_case=False, word_boundaries=False, unicode=True):
+    """
+    find_all with one re.finditer scan per pattern
+    """
+    if ignore_case:
+        text = text.lower()
+    b = r"\b" if word_boundaries else ""
+    res = {}
+    for p in patterns:
+        q = p.lower() if ignore_case else p
+        res[p] = [m.span() for m in re.finditer(b + re.escape(q) + b, text, re.UNICODE if unicode else 0)]
+    return res
+
+
+class PatternSet:
+    """
+    patterns compiled once into a matcher and searched in many texts with find_all semantics
+    """
+
+    def __init__(self, patterns, ignore_case=False, word_boundaries=False, unicode=True, algorithm="aho-corasick"):
+        """
+        :param patterns: iterable of strings
+        :param ignore_case: search the lowercased patterns in the lowercased text (unicode.lower keeps
+        the length so the spans are those of text)
+        :param word_boundaries: only keep occurrences with a regex \\b before and after them
+        :param unicode: word characters of re.UNICODE, else [a-zA-Z0-9_]
+        :param algorithm: key of MATCHERS
+        """
+        self.patterns = list(set(patterns))
+        self.ignore_case = ignore_case
+        self.word_boundaries = word_boundaries
+        self.unicode = unicode
+        self.keys = [p for p in self.patterns if p]
+        self.matcher = MATCHERS[algorithm]([p.lower() for p in self.keys] if ignore_case else self.keys)
+
+    def find_all(self, text, start=0, end=None):
+        """
+        :param start: only search text[start:end], the word boundaries still see the characters around it
+        (an occurrence of a pattern starting before start - 1 cannot hide an overlapping one of the range)
+        :param end: end of the searched range, the end of the text by default
+        :return: dict pattern -> list of the non overlapping (start, end) re.finditer would give
+        """
+        if end is None:
+            end = len(text)
+        # the searched range and one character on each side for the word boundaries
+        offset = max(start - 1, 0)
+        window = text[offset:end + 1]
+        if self.ignore_case:
+            window = window.lower()
+        res = dict((p, []) for p in self.patterns)
+
+        # position where the regex scan of each pattern would resume
+        pos = dict((p, 0) for p in self.keys)
+        for s, e, i in self.matcher.finditer(window):
+            p = self.keys[i]
+            if s < pos[p]:
+                continue
+            if self.word_boundaries and not (is_word_boundary(window, s, self.unicode) and
+                                             is_word_boundary(window, e, self.unicode)):
+                continue
+            pos[p] = e
+            if start <= s + offset and e + offset <= end:
+                res[p].append((s + offset, e + offset))
+
+        if "" in res:
+            res[""] = [(s + offset, e + offset)
+                       for s, e in find_all_regex(window, [""], False, self.word_boundaries, self.unicode)[""]
+                       if start <= s + offset and e + offset <= end]
+        return res
+
+
+def find_all(text, patterns, ignore_case=False, word_boundaries=False, unicode=True, algorithm="aho-corasick"):
+    """
+    occurrences of many patterns in one pass over the text, each pattern gets the
+    non overlapping spans re.finditer would give, the same as find_all_regex
+    see PatternSet for the parameters
+    :return: dict pattern -> list of (start, end)
+    """
+    return PatternSet(patterns, ignore_case, word_boundaries, unicode, algorithm).find_all(text)
@@ -0,0 +1,57 @@
+import numpy as np
+
+MASK32 = 0xFFFFFFFF
+
+
+def pack_pairs(s, o):
+    """
+    pack (subject id, object id) pairs into sortable 64-bit integer keys
+    :param s: subject ids, scalar or array of int32
+    :param o: object ids, scalar or array of int32
+    """
+    return (np.asarray(s, dtype=np.int64) << 32) | (np.asarray(o, dtype=np.int64) & MASK32)
+
+
+class PairIndex:
+    """
+    (subject, object) -> predicates lookup over a sorted array of packed 64-bit keys
+    lookups are read only, a missing pair never adds anything to the index
+    """
+
+    def __init__(self, keys, preds):
+        """
+        :param keys: sorted int64 array of packed (subject, object) keys
+        :param preds: predicate id of each key, in file order for equal keys
+        """
+        self.keys = keys
+        self.preds = preds
+
+    @classmethod
+    def build(cls, subj, pred, obj):
+        keys = pack_pairs(subj, obj)
+        order = np.argsort(keys, kind='mergesort')
+        return cls(keys[order], np.asarray(pred, dtype=np.int32)[order])
+
+    def get(self, s, o):
+        """
+        :return: array of predicate ids linking subject id s to object id o
+        """
+        return self.get_many([(s, o)])[0]
+
+    def get_many(self, pairs):
+        """
+        answer a batch of pairs with a single searchsorted call
+        :param pairs: list of (subject id, object id)
+        :return: list of predicate id arrays, one per pair
+        """
+        if len(pairs) == 0:
+            return []
+        s, o = zip(*pairs)
+        q = pack_pairs(s, o)
+        # left bound of key and of key + 1 gives the [start, end) range of each pair
+        bounds = np.searchsorted(self.keys, np.concatenate([q, q + 1])).tolist()
+        n = len(pairs)
+        return [self.preds[bounds[i]:bounds[n + i]] for i in range(n)]
+
+    def __len__(self):
+        return len(self.keys)
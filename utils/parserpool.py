@@ -0,0 +1,171 @@
+import multiprocessing
+import Queue
+from collections import deque
+
+# Pool of long lived parser processes, e.g. one SUTime (and JVM) per process.
+#
+# Each worker has its own bounded task queue so the pool knows which jobs a worker holds,
+# a worker that dies is restarted and its jobs are given to the new process.
+
+
+def parser_worker(parser_factory, tasks, results, worker):
+    parser = parser_factory()
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        job, text = task
+        try:
+            results.put((job, worker, parser.parse(text), None))
+        except Exception as e:
+            results.put((job, worker, None, repr(e)))
+
+
+class ParserPool:
+
+    def __init__(self, parser_factory, workers=None, queue_size=2, retries=2, poll=1.0):
+        """
+        :param parser_factory: picklable callable building the parser in each worker, the parser has a
+        parse(text) method, e.g. functools.partial(SUTime, jars=...) or a stub in tests
+        :param workers: number of processes, one per core by default
+        :param queue_size: number of jobs given to a worker at once
+        :param retries: number of times the job of a dead worker is given to its replacement
+        :param poll: seconds between two checks of the workers while waiting for results
+        """
+        self.parser_factory = parser_factory
+        self.size = workers or multiprocessing.cpu_count()
+        self.queue_size = queue_size
+        self.retries = retries
+        self.poll = poll
+
+        self.results = multiprocessing.Queue()
+        self.processes = [None] * self.size
+        self.tasks = [None] * self.size
+        # jobs held by each worker: job -> text
+        self.jobs = [{} for i in range(self.size)]
+        self.attempts = {}
+        # job -> (result, error) of the jobs done and not returned yet
+        self.done = {}
+        self.next_job = 0
+        self.restarts = 0
+        # task queues of the dead workers, see discard
+        self.discarded = []
+
+        for i in range(self.size):
+            self.start(i)
+
+    def start(self, i):
+        """
+        start worker i, with the jobs of its former process if it died
+        """
+        if self.tasks[i] is not None:
+            self.discard(self.tasks[i])
+        self.tasks[i] = multiprocessing.Queue(self.queue_size)
+        self.processes[i] = multiprocessing.Process(target=parser_worker,
+                                                    args=(self.parser_factory, self.tasks[i], self.results, i))
+        self.processes[i].daemon = True
+        self.processes[i].start()
+        for job in sorted(self.jobs[i]):
+            self.tasks[i].put((job, self.jobs[i][job]))
+
+    def discard(self, tasks):
+        """
+        empty the task queue of a dead worker, its feeder thread may still be writing to it: the queue
+        is not closed (the feeder would fail with a broken pipe) and not waited for at exit (it would hang)
+        """
+        tasks.cancel_join_thread()
+        while True:
+            try:
+                tasks.get_nowait()
+            except Queue.Empty:
+                break
+        self.discarded.append(tasks)
+
+    def check(self):
+        """
+        restart the dead workers, their jobs fail once they were tried retries + 1 times
+        """
+        for i, p in enumerate(self.processes):
+            if p.is_alive():
+                continue
+            self.restarts += 1
+            for job in list(self.jobs[i]):
+                self.attempts[job] = self.attempts.get(job, 1) + 1
+                if self.attempts[job] > self.retries + 1:
+                    del self.jobs[i][job]
+                    self.done[job] = (None, "parser worker died %s times" % self.attempts[job])
+            self.start(i)
+
+    def collect(self):
+        """
+        wait for one result, or for the poll time to restart the dead workers
+        """
+        self.check()
+        try:
+            job, i, result, error = self.results.get(timeout=self.poll)
+        except Queue.Empty:
+            return
+        # a job given again to a restarted worker may come back twice
+        if job in self.jobs[i]:
+            del self.jobs[i][job]
+            self.attempts.pop(job, None)
+            self.done[job] = (result, error)
+
+    def submit(self, text):
+        """
+        give a text to the least busy worker, waiting for one to have room in its queue
+        :return: job id to pass to result
+        """
+        while True:
+            i = min(range(self.size), key=lambda i: len(self.jobs[i]))
+            if len(self.jobs[i]) < self.queue_size:
+                break
+            self.collect()
+        job = self.next_job
+        self.next_job += 1
+        self.jobs[i][job] = text
+        self.tasks[i].put((job, text))
+        return job
+
+    def result(self, job):
+        """
+        wait for a job
+        :return: what the parser returned for its text
+        """
+        while job not in self.done:
+            self.collect()
+        result, error = self.done.pop(job)
+        if error is not None:
+            raise RuntimeError("parser pool job %s failed: %s" % (job, error))
+        return result
+
+    def parse(self, text):
+        return self.result(self.submit(text))
+
+    def imap(self, texts):
+        """
+        parse the texts in parallel, at most workers * queue_size of them at once
+        :param texts: iterable of texts, a None text is not given to the workers and gives None
+        :return: iterator over the parser results in the order of the texts
+        """
+        order = deque()
+        for text in texts:
+            if len(order) >= self.size * self.queue_size:
+                job = order.popleft()
+                yield self.result(job) if job is not None else None
+            order.append(self.submit(text) if text is not None else None)
+        while order:
+            job = order.popleft()
+            yield self.result(job) if job is not None else None
+
+    def close(self):
+        for i, p in enumerate(self.processes):
+            try:
+                self.tasks[i].put(None, timeout=self.poll)
+            except Queue.Full:
+                pass
+        for i, p in enumerate(self.processes):
+            p.join(self.poll)
+            if p.is_alive():
+                p.terminate()
+            self.discard(self.tasks[i])
@@ -0,0 +1,28 @@
+# read a whitelist of wikidata properties from the files in datasets/properties
+#   most-used-wikidata.csv:             "P31,25719862" property id and number of uses
+#   properties-item-number-time.csv:    one property uri per line
+baseuripred = "http://www.wikidata.org/prop/direct/"
+
+
+def read_properties(properties_file, top_k=None):
+    """
+    :param properties_file: csv file with one property (id or uri) per line, optionally followed by its frequency
+    :param top_k: keep only the k most frequent properties (file order if the file has no frequencies)
+    :return: set of property uris
+    """
+    properties = []
+    with open(properties_file) as f:
+        for l in f:
+            tmp = l.strip().split(",")
+            if tmp[0] == "":
+                continue
+            uri = tmp[0] if tmp[0].startswith("http") else "%s%s" % (baseuripred, tmp[0])
+            count = int(tmp[1]) if len(tmp) > 1 and tmp[1].isdigit() else None
+            properties.append((uri, count))
+
+    if top_k is not None:
+        if all([c is not None for u, c in properties]):
+            properties = sorted(properties, key=lambda x: x[1], reverse=True)
+        properties = properties[:top_k]
+
+    return set([u for u, c in properties])
@@ -0,0 +1,219 @@
+import bisect
+import httplib
+import json
+import re
+import socket
+import sys
+import threading
+import time
+import urllib
+import urlparse
+import Queue
+from multiprocessing.pool import ThreadPool
+
+# Client of the DBpedia Spotlight annotate service.
+#
+# Requests are sent by a pool of threads over keep-alive connections, at most concurrency at
+# a time, failed requests are retried with an exponential backoff. A whole document is sent in
+# one request and its annotations are given back to its sentences, with offsets converted from
+# java (utf-16) units to python characters. With a SpotlightCache the texts
+# annotated before, by this run or another one, are not sent again.
+
+
+class SpotlightError(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    keep-alive http connections to one server, reused by the threads of the client
+    """
+
+    def __init__(self, url, timeout=30):
+        parts = urlparse.urlsplit(url)
+        self.https = parts.scheme == "https"
+        self.host = parts.netloc
+        self.path = parts.path or "/"
+        self.timeout = timeout
+        self.idle = Queue.LifoQueue()
+
+    def get(self):
+        try:
+            return self.idle.get_nowait()
+        except Queue.Empty:
+            connection = httplib.HTTPSConnection if self.https else httplib.HTTPConnection
+            return connection(self.host, timeout=self.timeout)
+
+    def put(self, connection):
+        self.idle.put(connection)
+
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except Queue.Empty:
+                return
+
+
+def parse_annotations(data):
+    """
+    :param data: json response of the annotate service
+    :return: list of annotations {"URI", "surfaceForm", "offset", "support", "types", "similarityScore",
+    "percentageOfSecondRank"} as pyspotlight gave them, the surface form is always a string.
+    Raises ValueError if data is not json and KeyError if a resource has no URI or offset
+    """
+    res = []
+    for resource in json.loads(data).get("Resources", []):
+        ann = dict((k.lstrip("@"), v) for k, v in resource.items())
+        for k in ("URI", "offset"):
+            if k not in ann:
+                raise KeyError("resource without %s" % k)
+        for k in ("offset", "support"):
+            if k in ann:
+                ann[k] = int(ann[k])
+        for k in ("similarityScore", "percentageOfSecondRank"):
+            if k in ann:
+                ann[k] = float(ann[k])
+        ann["surfaceForm"] = unicode(ann.get("surfaceForm", u""))
+        res.append(ann)
+    return res
+
+
+# characters outside the BMP: one python character on wide builds but two java (utf-16) ones
+ASTRAL = re.compile(u"[\U00010000-\U0010ffff]") if sys.maxunicode > 0xffff else None
+
+
+def to_code_points(text, annotations):
+    """
+    :param annotations: annotations of text with the utf-16 offsets Spotlight gives
+    :return: the annotations with offsets in the characters of text
+    """
+    if ASTRAL is None or not ASTRAL.search(text):
+        return annotations
+    # utf-16 offset of each character
+    units = []
+    n = 0
+    for c in text:
+        units.append(n)
+        n += 2 if ord(c) > 0xffff else 1
+    return [dict(ann, offset=bisect.bisect_left(units, ann["offset"])) for ann in annotations]
+
+
+def split_annotations(annotations, sentences_boundaries):
+    """
+    :param annotations: annotations of a whole document
+    :return: list of the annotations of each sentence, with offsets relative to the sentence,
+    annotations that are not inside one sentence are dropped
+    """
+    starts = [start for (start, end) in sentences_boundaries]
+    res = [[] for s in sentences_boundaries]
+    for ann in annotations:
+        sid = bisect.bisect_right(starts, ann["offset"]) - 1
+        if sid < 0:
+            continue
+        start, end = sentences_boundaries[sid]
+        if ann["offset"] + len(ann["surfaceForm"]) <= end:
+            res[sid].append(dict(ann, offset=ann["offset"] - start))
+    return res
+
+
+class SpotlightClient:
+
+    def __init__(self, spotlight_url='http://localhost:2222/rest/annotate', confidence=0.2, support=1,
+                 concurrency=8, retries=3, backoff=0.5, timeout=30, cache=None):
+        """
+        :param spotlight_url: url of the dbpedia spotlight service
+        :param confidence: min confidence
+        :param support: min supporting document
+        :param concurrency: max number of requests at once
+        :param retries: number of times a request is retried after a connection error or a 5xx / 429 status
+        :param backoff: seconds before the first retry, doubled for each following one
+        :param timeout: seconds before a request is given up
+        :param cache: SpotlightCache of the annotations of the texts, None to send every text
+        """
+        self.spotlight_url = spotlight_url
+        self.confidence = confidence
+        self.support = support
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.connections = ConnectionPool(spotlight_url, timeout)
+        self.cache = cache
+        self.threads = None
+
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.retried = 0
+
+    def annotate(self, text):
+        """
+        :return: list of the annotations of the text, raises SpotlightError once the retries are exhausted
+        """
+        if self.cache is not None:
+            annotations = self.cache.get(text, self.confidence, self.support, self.spotlight_url)
+            if annotations is not None:
+                return annotations
+        body = urllib.urlencode({"text": text.encode("utf-8"), "confidence": self.confidence,
+                                 "support": self.support})
+        headers = {"Accept": "application/json", "Content-Type": "application/x-www-form-urlencoded"}
+
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            with self.lock:
+                self.requests += 1
+                self.retried += bool(attempt)
+            connection = self.connections.get()
+            try:
+                connection.request("POST", self.connections.path, body, headers)
+                response = connection.getresponse()
+                data = response.read()
+            except (httplib.HTTPException, socket.error) as e:
+                connection.close()
+                error = "%s: %s" % (type(e).__name__, e)
+                continue
+            self.connections.put(connection)
+            if response.status == 200:
+                try:
+                    annotations = to_code_points(text, parse_annotations(data))
+                except (ValueError, KeyError, TypeError, AttributeError) as e:
+                    # e.g. the html page of a proxy, not worth retrying
+                    error = "bad response %s: %s" % (type(e).__name__, e)
+                    break
+                if self.cache is not None:
+                    self.cache.put(text, self.confidence, self.support, self.spotlight_url, annotations)
+                return annotations
+            error = "HTTP %s %s" % (response.status, response.reason)
+            # client errors are not retried
+            if response.status < 500 and response.status != 429:
+                break
+        raise SpotlightError("%s failed: %s" % (self.spotlight_url, error))
+
+    def annotate_many(self, texts):
+        """
+        :return: list of the annotations of each text, requested concurrently
+        """
+        if len(texts) == 1:
+            return [self.annotate(texts[0])]
+        if self.threads is None:
+            self.threads = ThreadPool(self.concurrency)
+        return self.threads.map(self.annotate, texts, chunksize=1)
+
+    def annotate_documents(self, documents, per_sentence=False):
+        """
+        :param documents: Document objects
+        :param per_sentence: one request per sentence instead of one per document
+        :return: for each document, list of the annotations of each sentence with offsets relative to the sentence
+        """
+        if per_sentence:
+            texts = [d.text[start:end] for d in documents for (start, end) in d.sentences_boundaries]
+            annotations = iter(self.annotate_many(texts))
+            return [[next(annotations) for s in d.sentences_boundaries] for d in documents]
+        return [split_annotations(annotations, d.sentences_boundaries)
+                for d, annotations in zip(documents, self.annotate_many([d.text for d in documents]))]
+
+    def close(self):
+        if self.threads is not None:
+            self.threads.close()
+            self.threads = None
+        self.connections.close()
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Persistent cache of the Spotlight annotations of texts, shared by all the processes of a run.
+#
+#   annotations(hash, confidence, support, endpoint, used, value)
+# hash is the sha1 of the utf-8 text, value the json of its annotations and used the last time
+# they were read. Once the cache holds more than max_entries texts the least recently used
+# ones are evicted. Reads do not write: the used times of the hits are kept in memory and
+# written with the next insertion, or once touch_every of them are waiting.
+
+
+def text_hash(text):
+    if isinstance(text, unicode):
+        text = text.encode('utf-8')
+    return hashlib.sha1(text).hexdigest()
+
+
+class SpotlightCache:
+
+    def __init__(self, cache_file, max_entries=10000000, check_every=1000, touch_every=1000):
+        """
+        :param cache_file: sqlite file, created if it does not exist
+        :param max_entries: number of texts kept
+        :param check_every: number of insertions between two evictions
+        :param touch_every: max number of hits whose used time is not written yet
+        """
+        self.cache_file = cache_file
+        self.max_entries = max_entries
+        self.check_every = check_every
+        self.touch_every = touch_every
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.puts = 0
+        # key -> last time it was read, not written yet
+        self.touched = {}
+
+        # not kept open, the cache is often built before the pipeline forks its workers
+        c = sqlite3.connect(cache_file, timeout=60)
+        c.execute("CREATE TABLE IF NOT EXISTS annotations (hash TEXT, confidence REAL, support INTEGER, "
+                  "endpoint TEXT, used REAL, value TEXT, PRIMARY KEY (hash, confidence, support, endpoint))")
+        c.execute("CREATE INDEX IF NOT EXISTS annotations_used ON annotations (used)")
+        c.commit()
+        c.close()
+
+    def connection(self):
+        """
+        :return: the connection of this thread, sqlite connections cannot be shared between threads or forks
+        """
+        if getattr(self.local, "pid", None) != os.getpid():
+            self.local.pid = os.getpid()
+            self.local.conn = sqlite3.connect(self.cache_file, timeout=60)
+            # readers do not block the writer of another process
+            self.local.conn.execute("PRAGMA journal_mode = WAL")
+            self.local.conn.execute("PRAGMA synchronous = NORMAL")
+        return self.local.conn
+
+    def get(self, text, confidence, support, endpoint):
+        """
+        :return: the cached annotations of the text, None if there are none
+        """
+        key = (text_hash(text), confidence, support, endpoint)
+        c = self.connection()
+        r = c.execute("SELECT value FROM annotations WHERE hash = ? AND confidence = ? AND support = ? AND endpoint = ?",
+                      key).fetchone()
+        with self.lock:
+            if r is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.touched[key] = time.time()
+                flush = len(self.touched) >= self.touch_every
+        if r is None:
+            return None
+        if flush:
+            self.flush()
+        return json.loads(r[0])
+
+    def put(self, text, confidence, support, endpoint, annotations):
+        c = self.connection()
+        c.execute("INSERT OR REPLACE INTO annotations (hash, confidence, support, endpoint, used, value) "
+                  "VALUES (?, ?, ?, ?, ?, ?)",
+                  (text_hash(text), confidence, support, endpoint, time.time(), json.dumps(annotations)))
+        # in the same transaction
+        self.flush(commit=False)
+        c.commit()
+        with self.lock:
+            self.puts += 1
+            evict = self.puts % self.check_every == 0
+        if evict:
+            self.evict()
+
+    def flush(self, commit=True):
+        """
+        write the used times of the hits
+        """
+        with self.lock:
+            touched = self.touched
+            self.touched = {}
+        if not touched:
+            return
+        c = self.connection()
+        c.executemany("UPDATE annotations SET used = ? WHERE hash = ? AND confidence = ? AND support = ? AND endpoint = ?",
+                      [(used,) + key for key, used in touched.items()])
+        if commit:
+            c.commit()
+
+    def evict(self):
+        """
+        drop the least recently used texts down to 90% of max_entries if the cache is full
+        """
+        self.flush()
+        c = self.connection()
+        n = c.execute("SELECT COUNT(*) FROM annotations").fetchone()[0]
+        if n > self.max_entries:
+            c.execute("DELETE FROM annotations WHERE rowid IN "
+                      "(SELECT rowid FROM annotations ORDER BY used LIMIT ?)", (n - int(self.max_entries * 0.9),))
+            c.commit()
+
+    def __len__(self):
+        return self.connection().execute("SELECT COUNT(*) FROM annotations").fetchone()[0]
+
+    def stats(self):
+        """
+        :return: hit / miss counts of this process
+        """
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / float(total) if total else 0.0}
@@ -0,0 +1,131 @@
+import os
+import json
+import hashlib
+import numpy as np
+
+SURFACE_FORMS_VERSION = 1
+
+# Global surface form -> entities dictionary over the labels of a LabelReader.
+#
+# Surface forms are lowercased with their whitespace collapsed and stored by a 64-bit
+# hash in a sorted array, the entities of keys[i] are the Q numbers
+# ids[offsets[i]:offsets[i+1]]. The arrays can be saved to a folder and memory mapped.
+
+
+def normalize(s):
+    return u" ".join(s.lower().split())
+
+
+def surface_hash(s):
+    """
+    :param s: normalized surface form
+    """
+    if isinstance(s, unicode):
+        s = s.encode('utf-8')
+    return np.frombuffer(hashlib.md5(s).digest()[:8], dtype=np.int64)[0]
+
+
+class SurfaceFormIndex:
+
+    def __init__(self, keys, offsets, ids, max_length):
+        """
+        :param keys: sorted int64 hashes of the surface forms
+        :param offsets: entities of keys[i] are ids[offsets[i]:offsets[i+1]]
+        :param ids: int32 Q numbers of the entities
+        :param max_length: length in characters of the longest surface form
+        """
+        self.keys = keys
+        self.offsets = offsets
+        self.ids = ids
+        self.max_length = max_length
+
+    @classmethod
+    def build(cls, label_read, lang=None, max_length=100):
+        """
+        :param label_read: LabelReader, the labels of every entity it knows are added (with its language fallback)
+        :param lang: language of the labels, by default the language of label_read
+        :param max_length: longer labels are skipped
+        """
+        hashes = []
+        ids = []
+        longest = 0
+        for key in label_read.entities():
+            if not key.startswith("Q") or not key[1:].isdigit():
+                continue
+            for label in label_read.get(key, lang):
+                label = normalize(label)
+                if not label or len(label) > max_length:
+                    continue
+                hashes.append(surface_hash(label))
+                ids.append(int(key[1:]))
+                longest = max(longest, len(label))
+
+        hashes = np.array(hashes, dtype=np.int64)
+        ids = np.array(ids, dtype=np.int32)
+
+        # sort by (surface form, entity) and drop the duplicates given by aliases
+        order = np.lexsort((ids, hashes))
+        hashes, ids = hashes[order], ids[order]
+        if len(hashes):
+            keep = np.ones(len(hashes), dtype=np.bool_)
+            keep[1:] = (hashes[1:] != hashes[:-1]) | (ids[1:] != ids[:-1])
+            hashes, ids = hashes[keep], ids[keep]
+
+        keys, starts = np.unique(hashes, return_index=True)
+        offsets = np.append(starts, len(hashes)).astype(np.int64)
+        return cls(keys, offsets, ids, longest)
+
+    @classmethod
+    def open(cls, index_dir):
+        """
+        memory map a folder written by save
+        """
+        with open(os.path.join(index_dir, "meta.json")) as f:
+            meta = json.load(f)
+        if meta["version"] != SURFACE_FORMS_VERSION:
+            raise ValueError("surface form index %s has version %s, expected %s"
+                             % (index_dir, meta["version"], SURFACE_FORMS_VERSION))
+        arrays = [np.load(os.path.join(index_dir, "%s.npy" % name), mmap_mode='r')
+                  for name in ("keys", "offsets", "ids")]
+        return cls(*(arrays + [meta["max_length"]]))
+
+    def save(self, index_dir):
+        if not os.path.exists(index_dir):
+            os.makedirs(index_dir)
+        for name in ("keys", "offsets", "ids"):
+            np.save(os.path.join(index_dir, "%s.npy" % name), getattr(self, name))
+        with open(os.path.join(index_dir, "meta.json"), "w") as f:
+            json.dump({"version": SURFACE_FORMS_VERSION,
+                       "surface_forms": len(self.keys),
+                       "max_length": self.max_length}, f)
+        return index_dir
+
+    def get(self, surface):
+        """
+        :param surface: normalized surface form
+        :return: read only array of the Q numbers of the entities with this label
+        """
+        h = surface_hash(surface)
+        i = int(np.searchsorted(self.keys, h))
+        if i < len(self.keys) and self.keys[i] == h:
+            return self.ids[int(self.offsets[i]):int(self.offsets[i + 1])]
+        return self.ids[0:0]
+
+    def find(self, text, words_boundaries):
+        """
+        look up every token n-gram of the text no longer than the longest surface form
+        :param words_boundaries: (start, end) of the tokens of the text
+        :return: iterator over (start, end, Q numbers) of the n-grams that are surface forms
+        """
+        lower = text.lower()
+        for i, (start, end) in enumerate(words_boundaries):
+            for j in range(i, len(words_boundaries)):
+                end = words_boundaries[j][1]
+                if end - start > self.max_length:
+                    break
+                ids = self.get(normalize(lower[start:end]))
+                if len(ids):
+                    yield start, end, ids
+
+    def __len__(self):
+        return len(self.keys)
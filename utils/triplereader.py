@@ -1,21 +1,31 @@
-from collections import defaultdict
+from utils.kbstore import open_kb
 
+# pair view over the shared KBStore / KBIndex: (subject, object) -> [predicate, predicate]
 class TripleReader:
 
-    def __init__(self, triples_file):
-
+    def __init__(self, triples_file, properties=None, top_k=None):
+        """
+        :param triples_file: path of the wikidata triples file, of a compiled KB index or sqlite KB, or a KB shared with the other readers
+        :param properties: optional whitelist of predicate uris or file of datasets/properties to load from the triples file
+        :param top_k: keep only the top k most used properties of the properties file
+        """
         self.baseuripred = "http://www.wikidata.org/prop/direct/"
         self.baseuriobj = "http://www.wikidata.org/entity/"
 
-        self.d = defaultdict(list)
-        with open(triples_file) as f:
-            for l in f:
-                tmp = l.split("\t")
-                if len(tmp) == 3:
-                    self.d["%s%s" %
-                           (tmp[0].strip().replace(self.baseuriobj, ""),
-                            tmp[2].strip().replace(self.baseuriobj, ""))].append(tmp[1].strip().replace(self.baseuripred, ""))
+        self.kb = open_kb(triples_file, properties, top_k)
 
     def get(self, suri, objuri):
-        p = self.d["%s%s" % (suri.strip().replace(self.baseuriobj, ""), objuri.strip().replace(self.baseuriobj, ""))]
-        return ["%s%s" % (self.baseuripred, i) for i in p]
\ No newline at end of file
+        return self.kb.get_predicates(suri, objuri)
+
+    def get_many(self, pairs):
+        """
+        :param pairs: list of (subject uri, object uri) e.g. all entity pairs of a sentence
+        :return: list of predicate lists, one per pair, looked up in one batch
+        """
+        return self.kb.get_predicates_many(pairs)
+
+    def prefetch(self, uris):
+        """
+        load the entities of a batch of documents in bulk when the KB is disk backed
+        """
+        self.kb.prefetch(uris)
@@ -1,28 +1,50 @@
-from collections import defaultdict
+import numpy as np
+from utils.kbstore import open_kb
+from utils.adjacency import NeighbourView
 
-# Create a defaultdict {entity:[entity, entity]}
+# entity view over the shared KBStore / KBIndex: entity -> read only set of neighbour entities
 class TripleReaderItems:
 
-    def __init__(self, triples_file):
-
+    def __init__(self, triples_file, properties=None, top_k=None):
+        """
+        :param triples_file: path of the wikidata triples file, of a compiled KB index or sqlite KB, or a KB shared with the other readers
+        :param properties: optional whitelist of predicate uris or file of datasets/properties to load from the triples file
+        :param top_k: keep only the top k most used properties of the properties file
+        """
         self.baseuri = "http://www.wikidata.org/entity/"
 
-        self.d = defaultdict(list)
-        with open(triples_file) as f:
-            for l in f:
-                tmp = l.split("\t")
-                if len(tmp) < 3:
-                    continue
-                # check whether object is also an entity
-                if self.baseuri in tmp[2]:
-                    subj = tmp[0].strip().replace(self.baseuri, "")
-                    obj = tmp[2].strip().replace(self.baseuri, "")
-                    # We want to have the entity whether it's object or subject
-                    self.d[subj].append(obj)
-                    self.d[obj].append(subj)
+        self.kb = open_kb(triples_file, properties, top_k)
+
+        # id -> uri of every entity returned so far, filled lazily
+        self.uris = {}
+
+    def to_uri(self, i):
+        uri = self.uris.get(i)
+        if uri is None:
+            uri = self.kb.uri(i)
+            self.uris[i] = uri
+        return uri
 
     def get(self, uri):
-        p = self.d[uri.strip().replace(self.baseuri, "")]
+        """
+        :return: read only set of the uris linked to uri, including uri itself
+        """
+        e = self.kb.lookup(uri)
+        if e is None:
+            # keep the key as possible entity ID
+            return frozenset(["%s%s" % (self.baseuri, uri.strip().replace(self.baseuri, ""))])
+
+        ids = self.kb.get_neighbour_ids(uri)
         # add the key as a value to keep it as possible entity ID
-        p.append(uri.strip().replace(self.baseuri, ""))
-        return set(["%s%s" % (self.baseuri, i) for i in p])
\ No newline at end of file
+        j = int(np.searchsorted(ids, e))
+        if j == len(ids) or ids[j] != e:
+            ids = np.insert(ids, j, e)
+            ids.flags.writeable = False
+
+        return NeighbourView(ids, self.to_uri, self.kb.lookup)
+
+    def prefetch(self, uris):
+        """
+        load the entities of a batch of documents in bulk when the KB is disk backed
+        """
+        self.kb.prefetch(uris)
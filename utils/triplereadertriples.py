@@ -1,32 +1,25 @@
-from collections import defaultdict
+from utils.kbstore import open_kb
 
-# Create a defaultdict {entity:[entity, entity]}
+# triples view over the shared KBStore / KBIndex: entity -> [[subject, predicate, object], ...]
 class TripleReaderTriples:
 
-    def __init__(self, triples_file):
-
+    def __init__(self, triples_file, properties=None, top_k=None):
+        """
+        :param triples_file: path of the wikidata triples file, of a compiled KB index or sqlite KB, or a KB shared with the other readers
+        :param properties: optional whitelist of predicate uris or file of datasets/properties to load from the triples file
+        :param top_k: keep only the top k most used properties of the properties file
+        """
         self.baseuri = "http://www.wikidata.org/entity/"
         self.baseuripred = "http://www.wikidata.org/prop/direct/"
 
-        self.d = defaultdict(list)
-        with open(triples_file) as f:
-            for l in f:
-                tmp = l.split("\t")
-                if len(tmp) == 3:
-                    subj_id = tmp[0].strip().replace(self.baseuri, "")
-                    subj = tmp[0].strip()
-                    pred = tmp[1].strip()
-                    obj = tmp[2].strip()
-                    # create triples for each line
-                    triple = [subj, pred, obj]
-                    self.d[subj_id].append(triple)
-
-                    # We want to have the entity whether it's object or subject
-                    # check whether object is also an entity
-                    if self.baseuri in tmp[2]:
-                        obj_id = tmp[2].strip().replace(self.baseuri, "")
-                        self.d[obj_id].append(triple)
+        self.kb = open_kb(triples_file, properties, top_k)
 
     def get(self, uri):
         # return triples for given entity id
-        return self.d[uri.strip().replace(self.baseuri, "")]
\ No newline at end of file
+        return self.kb.get_triples(uri)
+
+    def prefetch(self, uris):
+        """
+        load the entities of a batch of documents in bulk when the KB is disk backed
+        """
+        self.kb.prefetch(uris)